@@ -0,0 +1,139 @@
+import pickle
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from core import scoring_worker
+from core.export_report import get_export_report
+from core.leaderboard import update_reports_points
+from core.report_cache import ReportResult, get_report_keys, store_report_results
+from core.report_rows import update_reports_rows
+from core.scoring_config import get_scoring_config
+from extra_ep.models import ImportJob, Report
+
+
+class ScoredReport(NamedTuple):
+    report_id: int
+    result: Optional[ReportResult]
+    seconds: float
+    error: str = ''
+
+
+def score_report(report_id: int) -> ScoredReport:
+    started_at = perf_counter()
+    try:
+        exporter = get_export_report(report_id)
+        result = ReportResult(data=exporter.process(), warnings=exporter.warnings)
+    except Exception:  # noqa: B902
+        # the report is not scored again until it changes, so it does not block the others
+        return ScoredReport(
+            report_id=report_id,
+            result=None,
+            seconds=perf_counter() - started_at,
+            error=traceback.format_exc(),
+        )
+
+    return ScoredReport(report_id=report_id, result=result, seconds=perf_counter() - started_at)
+
+
+def mark_reports_for_scoring(reports: 'QuerySet[Report]') -> None:
+    """
+    The points of the reports are outdated, the import worker scores them again
+    """
+    reports.filter(needs_scoring=False).update(needs_scoring=True)
+
+
+def claim_reports_for_scoring(limit: int) -> List[int]:
+    """
+    Take marked reports, except those being imported. Rows locked by other workers are skipped,
+    the same way as `claim_job` does for imports.
+    """
+    with transaction.atomic():
+        report_ids = list(Report.objects.select_for_update(
+            skip_locked=True,
+        ).filter(
+            needs_scoring=True,
+        ).exclude(
+            id__in=ImportJob.objects.filter(
+                status__in=(ImportJob.QUEUED, ImportJob.RUNNING),
+            ).values('report_id'),
+        ).order_by('id').values_list('id', flat=True)[:limit])
+
+        Report.objects.filter(id__in=report_ids).update(needs_scoring=False)
+
+    return report_ids
+
+
+class BatchScorer:
+    """
+    Scores many reports at once, e.g. the whole season after a change of the rules.
+    Reports are spread over a process pool sharing one scoring config snapshot,
+    results are written to the leaderboard, rows of report pages and the report cache in bulk.
+    It is the only writer of the leaderboard, requests only read it.
+    """
+    BATCH_SIZE = 20
+
+    def __init__(self, processes: int = 1, batch_size: int = BATCH_SIZE) -> None:
+        self.processes = processes
+        self.batch_size = batch_size
+
+    def process(self, report_ids: List[int]) -> Iterator[ScoredReport]:
+        # keys are taken and marks are cleared before scoring, so reports changed meanwhile
+        # are not cached with outdated results and are marked by the signals to be scored again
+        keys = get_report_keys(report_ids)
+        Report.objects.filter(id__in=report_ids, needs_scoring=True).update(needs_scoring=False)
+
+        saved = 0
+        batch: List[ScoredReport] = []
+        try:
+            for scored_report in self._score(report_ids):
+                batch.append(scored_report)
+                if len(batch) >= self.batch_size:
+                    self._save(batch, keys)
+                    saved += len(batch)
+                    batch = []
+
+                yield scored_report
+
+            self._save(batch, keys)
+        except BaseException:
+            # interrupted, reports which are not saved yet are left for the import worker
+            mark_reports_for_scoring(Report.objects.filter(id__in=report_ids[saved:]))
+            raise
+
+    def _score(self, report_ids: List[int]) -> Iterator[ScoredReport]:
+        if self.processes == 1:
+            for report_id in report_ids:
+                yield score_report(report_id)
+            return
+
+        # spawned workers do not inherit the database connection of this process
+        with ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=get_context('spawn'),
+            initializer=scoring_worker.init_worker,
+            initargs=(settings.DATABASES, pickle.dumps(get_scoring_config())),
+        ) as executor:
+            yield from executor.map(scoring_worker.score_report, report_ids)
+
+    @staticmethod
+    def _save(batch: List[ScoredReport], keys: Dict[int, str]) -> None:
+        results = {
+            scored_report.report_id: scored_report.result
+            for scored_report in batch
+            if scored_report.result is not None
+        }
+        if not results:
+            return
+
+        update_reports_points({report_id: result.data for report_id, result in results.items()})
+        update_reports_rows(results)
+        Report.objects.filter(id__in=results.keys()).update(scored_at=timezone.now())
+        store_report_results({keys[report_id]: result for report_id, result in results.items()})
@@ -0,0 +1,218 @@
+import bz2
+import gzip
+import lzma
+import os
+import zipfile
+from typing import IO, BinaryIO, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, cast
+
+# pseudo events produced by CombatLogReader
+PLAYERS_SEEN = 'PLAYERS_SEEN'
+LOG_END = 'LOG_END'
+
+
+class LogEvent(NamedTuple):
+    datetime_str: str
+    event: str
+    row: List[str]
+    # the whole row is kept only for COMBATANT_INFO, its auras are at the end of the row
+    row_raw: str = ''
+
+
+def split_fields(row_raw: str, start: int, amount: int) -> List[str]:
+    """
+    Split first `amount` comma separated fields of the row beginning from `start` position.
+    Commas inside of quoted fields (like "Core Hound, Elite") are not treated as separators.
+    """
+    fields = row_raw[start:].split(',', amount)
+    if len(fields) > amount:
+        fields.pop()
+    else:
+        fields[-1] = fields[-1].rstrip()
+
+    for field in fields:
+        # naive split is wrong only if some quoted field has a comma inside
+        if field[:1] == '"' and (len(field) == 1 or field[-1] != '"'):
+            return _split_quoted_fields(row_raw, start, amount)
+
+    return fields
+
+
+def _split_quoted_fields(row_raw: str, start: int, amount: int) -> List[str]:
+    result: List[str] = []
+    position = start
+    while len(result) < amount:
+        if row_raw.startswith('"', position):
+            field_end = row_raw.find(',', row_raw.find('"', position + 1))
+        else:
+            field_end = row_raw.find(',', position)
+
+        if field_end == -1:
+            result.append(row_raw[position:].rstrip())
+            break
+
+        result.append(row_raw[position:field_end])
+        position = field_end + 1
+
+    return result
+
+
+class CombatLogTokenizer:
+    """
+    Tokenizer for rows like `12/30 21:19:14.526  SPELL_AURA_APPLIED,Player-4452-01,"Name-Server",...`.
+
+    The event name is checked before anything is split, so rows of untracked events
+    (damage, heal, etc.) are dropped without creating new strings.
+    """
+
+    def __init__(self, event_fields: Dict[str, int]) -> None:
+        # event: amount of fields after the event name needed to process it
+        self.event_fields = event_fields
+        self._prefixes = tuple(f'{event},' for event in event_fields)
+
+    def tokenize(self, row_raw: str) -> Optional[Tuple[str, str, List[str]]]:
+        separator = row_raw.find('  ')
+        if separator == -1 or not row_raw.startswith(self._prefixes, separator + 2):
+            return None
+
+        event_end = row_raw.find(',', separator + 2)
+        event = row_raw[separator + 2:event_end]
+
+        return row_raw[:separator], event, split_fields(row_raw, event_end + 1, self.event_fields[event])
+
+    @staticmethod
+    def get_datetime_str(row_raw: str) -> Optional[str]:
+        separator = row_raw.find('  ')
+        if separator == -1:
+            return None
+
+        return row_raw[:separator]
+
+
+class CombatLogReader:
+    """
+    Turns rows of the log into events the importer needs.
+
+    Rows of untracked spells are dropped, only names of the players who cast them are collected and
+    emitted as PLAYERS_SEEN before every encounter event. The reader does not touch the database,
+    so segments of one log could be read in parallel processes and their events chained in order.
+    """
+
+    def __init__(self, event_fields: Dict[str, int], tracked_spell_ids: FrozenSet[str], server_postfix: str) -> None:
+        self.tokenizer = CombatLogTokenizer(event_fields)
+        self.tracked_spell_ids = tracked_spell_ids
+        self.server_postfix = server_postfix
+
+    def read(self, rows: Iterable[str]) -> Iterator[LogEvent]:
+        players_seen: Set[str] = set()
+        last_row_raw = None
+        # time of the last row with tokens, the last row of a truncated log could have no time
+        last_datetime_str = None
+
+        for row_raw in rows:
+            last_row_raw = row_raw
+            tokens = self.tokenizer.tokenize(row_raw)
+            if tokens is None:
+                continue
+
+            datetime_str, event, row = tokens
+            last_datetime_str = datetime_str
+            if not self._is_tracked(event, row, players_seen):
+                continue
+
+            if event in ('ENCOUNTER_START', 'ENCOUNTER_END') and players_seen:
+                yield LogEvent(datetime_str, PLAYERS_SEEN, list(players_seen))
+                players_seen = set()
+
+            yield LogEvent(datetime_str, event, row, row_raw if event == 'COMBATANT_INFO' else '')
+
+        if last_row_raw is not None:
+            last_datetime_str = self.tokenizer.get_datetime_str(last_row_raw) or last_datetime_str
+
+        if last_datetime_str is None:
+            # nothing to import in these rows
+            return
+
+        if players_seen:
+            yield LogEvent(last_datetime_str, PLAYERS_SEEN, list(players_seen))
+
+        yield LogEvent(last_datetime_str, LOG_END, [])
+
+    def _is_tracked(self, event: str, row: List[str], players_seen: Set[str]) -> bool:
+        """
+        False for SPELL_* rows of untracked spells. Casters from our server are added to `players_seen` anyway.
+        """
+        if event in ('SPELL_CAST_SUCCESS', 'SPELL_AURA_APPLIED'):
+            player_name = row[1].strip('"')
+            if player_name.endswith(self.server_postfix):
+                players_seen.add(player_name)
+
+            return row[8] in self.tracked_spell_ids
+
+        if event == 'SPELL_AURA_REMOVED':
+            return row[8] in self.tracked_spell_ids
+
+        return True
+
+    def read_segment(self, log_path: str, start: int, end: int, encoding: str) -> List[LogEvent]:
+        return list(self.read(self._read_segment_rows(log_path, start, end, encoding)))
+
+    @staticmethod
+    def _read_segment_rows(log_path: str, start: int, end: int, encoding: str) -> Iterator[str]:
+        with open(log_path, 'rb') as log_file:
+            log_file.seek(start)
+            position = start
+            while position < end:
+                line = log_file.readline()
+                if not line:
+                    break
+
+                position += len(line)
+                yield line.decode(encoding)
+
+
+def split_log(log_path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split the file into byte ranges of about the same size, every range begins at a row start.
+    """
+    size = os.path.getsize(log_path)
+    offsets = [0]
+    with open(log_path, 'rb') as log_file:
+        for part in range(1, parts):
+            log_file.seek(size * part // parts)
+            log_file.readline()
+            offset = log_file.tell()
+            if offsets[-1] < offset < size:
+                offsets.append(offset)
+
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def open_log_file(log_file: BinaryIO) -> IO[bytes]:
+    """
+    Detect archives by magic bytes and return a stream decompressing them on the fly.
+    Plain logs are returned as is.
+    """
+    magic = log_file.read(6)
+    log_file.seek(0)
+
+    if magic.startswith(b'\x1f\x8b'):
+        # GzipFile is not an IO[bytes] for typeshed, though it is a binary file object as well
+        return cast(IO[bytes], gzip.GzipFile(fileobj=log_file, mode='rb'))
+
+    if magic.startswith(b'BZh'):
+        return bz2.BZ2File(log_file, mode='rb')
+
+    if magic.startswith(b'\xfd7zXZ\x00'):
+        return lzma.LZMAFile(log_file, mode='rb')
+
+    if magic.startswith(b'PK\x03\x04'):
+        archive = zipfile.ZipFile(log_file)
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if not members:
+            raise ValueError('В архиве нет файлов')
+
+        # the biggest file in the archive is the log
+        return archive.open(max(members, key=lambda info: info.file_size))
+
+    return log_file
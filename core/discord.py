@@ -1,15 +1,16 @@
 from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List
 from urllib.parse import urljoin
 
-from discord_webhook import DiscordEmbed, DiscordWebhook
+from discord_webhook import DiscordEmbed
 from django.conf import settings
 from django.urls import reverse
 from django.templatetags.static import static
 
-from core.export_report import BaseConsumableUsageModel, ExportReport, ReportType
+from core.export_report import BaseConsumableUsageModel, ReportType
+from core.report_cache import get_report_result
 from extra_ep.models import Player, RaidRun, Report
 
 
@@ -21,8 +22,8 @@ def bold(sting: str) -> str:
 class DiscordNotification:
     report: Report
 
-    def notify(self) -> None:
-        report_data = ExportReport(report_id=self.report.id).process()
+    def get_embed(self) -> Dict[str, Any]:
+        report_data = get_report_result(self.report.id).data
         players = self._get_players(list(report_data.keys()))
         report_data = self._regroup_report(report_data)
         raid_runs = self._get_raid_runs(list(report_data.keys()))
@@ -56,9 +57,7 @@ class DiscordNotification:
                 )
             self._add_total(report_data, players, embed)
 
-        webhook = DiscordWebhook(url=settings.DISCORD_WEBHOOK_URL)
-        webhook.add_embed(embed)
-        webhook.execute()
+        return embed.__dict__
 
     def _add_total(self, report_data: ReportType, players: List[Player], embed: DiscordEmbed) -> None:
         total = defaultdict(list)
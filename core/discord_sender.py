@@ -0,0 +1,211 @@
+import time
+import traceback
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.discord import DiscordNotification
+from extra_ep.models import DiscordMessage, Report
+
+# limits of Discord for one webhook message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARACTERS = 6000
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+# messages of a sender which died while sending are taken again after this time
+SENDING_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_report(report: Report) -> DiscordMessage:
+    return DiscordMessage.objects.create(report=report)
+
+
+def get_embed_length(embed: Dict[str, Any]) -> int:
+    """
+    Characters counted by Discord against the limit of one message
+    """
+    texts = [
+        embed.get('title'),
+        embed.get('description'),
+        (embed.get('author') or {}).get('name'),
+        (embed.get('footer') or {}).get('text'),
+    ]
+    for field in embed.get('fields') or []:
+        texts.extend([field.get('name'), field.get('value')])
+
+    return sum(len(text) for text in texts if text)
+
+
+def claim_messages(limit: int = MAX_EMBEDS * 5) -> List[DiscordMessage]:
+    """
+    Take due messages in the order of queueing. Rows locked by other senders are skipped,
+    the same way as `claim_job` does for imports.
+    """
+    now = timezone.now()
+    is_due = Q(status=DiscordMessage.QUEUED, next_attempt_at__lte=now) | Q(
+        status=DiscordMessage.SENDING,
+        updated_at__lt=now - SENDING_TIMEOUT,
+    )
+
+    with transaction.atomic():
+        message_ids = list(DiscordMessage.objects.select_for_update(
+            skip_locked=True,
+        ).filter(
+            is_due,
+        ).order_by('id').values_list('id', flat=True)[:limit])
+
+        if not message_ids:
+            return []
+
+        # SQLite has no row locks, the status check in UPDATE and the claim time keep a single owner
+        DiscordMessage.objects.filter(is_due, id__in=message_ids).update(
+            status=DiscordMessage.SENDING,
+            updated_at=now,
+        )
+
+    return list(DiscordMessage.objects.filter(
+        id__in=message_ids,
+        status=DiscordMessage.SENDING,
+        updated_at=now,
+    ).select_related('report').order_by('id'))
+
+
+class DiscordSender:
+    """
+    Posts queued reports to the webhook. Embeds of several reports are sent in one message
+    and one HTTP connection is used for all requests. Rate limits of Discord are respected:
+    on 429 messages are postponed for `retry_after`, other errors are retried with a growing delay.
+    """
+
+    def __init__(self, url: str = '', timeout: Optional[float] = None) -> None:
+        self.url = url or settings.DISCORD_WEBHOOK_URL
+        self.timeout = timeout or settings.DISCORD_TIMEOUT
+        self.session = requests.Session()
+        self.available_at = 0.0
+
+    def send_pending(self) -> int:
+        """
+        Returns amount of processed messages, 0 means there is nothing to send now
+        """
+        messages = claim_messages()
+
+        embeds = {}
+        for message in messages:
+            try:
+                embeds[message.id] = DiscordNotification(report=message.report).get_embed()
+            except Exception:  # noqa: B902
+                self._fail([message], traceback.format_exc())
+
+        batches = list(self._get_batches([message for message in messages if message.id in embeds], embeds))
+        for i, batch in enumerate(batches):
+            retry_after = self._post(batch, [embeds[message.id] for message in batch])
+            if retry_after is not None:
+                # the limit is shared by the whole webhook, so the rest waits as well
+                postponed = [message for rest in batches[i:] for message in rest]
+                self._postpone(postponed, retry_after)
+                break
+
+        return len(messages)
+
+    @staticmethod
+    def _get_batches(
+        messages: List[DiscordMessage],
+        embeds: Dict[int, Dict[str, Any]],
+    ) -> Iterator[List[DiscordMessage]]:
+        batch: List[DiscordMessage] = []
+        length = 0
+        for message in messages:
+            embed_length = get_embed_length(embeds[message.id])
+            if batch and (len(batch) >= MAX_EMBEDS or length + embed_length > MAX_EMBED_CHARACTERS):
+                yield batch
+                batch = []
+                length = 0
+
+            batch.append(message)
+            length += embed_length
+
+        if batch:
+            yield batch
+
+    def _post(self, batch: List[DiscordMessage], embeds: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Returns seconds to wait when the webhook is rate limited
+        """
+        delay = self.available_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        try:
+            response = self.session.post(self.url, json={'embeds': embeds}, timeout=self.timeout)
+        except requests.RequestException:
+            self._retry(batch, traceback.format_exc())
+            return None
+
+        if response.status_code == 429:
+            return self._get_retry_after(response)
+
+        # the bucket is empty, the next request would be rate limited
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset_after = float(response.headers.get('X-RateLimit-Reset-After', 0))
+            self.available_at = time.monotonic() + reset_after
+
+        if response.ok:
+            DiscordMessage.objects.filter(id__in=[message.id for message in batch]).update(
+                status=DiscordMessage.SENT,
+                sent_at=timezone.now(),
+                updated_at=timezone.now(),
+                error='',
+            )
+        elif response.status_code >= 500:
+            self._retry(batch, f'{response.status_code}: {response.text}')
+        else:
+            # the request itself is wrong, sending it again does not help
+            self._fail(batch, f'{response.status_code}: {response.text}')
+
+        return None
+
+    @staticmethod
+    def _get_retry_after(response: requests.Response) -> float:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None:
+            try:
+                retry_after = response.json().get('retry_after')
+            except ValueError:
+                pass
+
+        return float(retry_after or 1)
+
+    @staticmethod
+    def _postpone(messages: List[DiscordMessage], seconds: float) -> None:
+        DiscordMessage.objects.filter(id__in=[message.id for message in messages]).update(
+            status=DiscordMessage.QUEUED,
+            next_attempt_at=timezone.now() + timedelta(seconds=seconds),
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def _retry(messages: List[DiscordMessage], error: str) -> None:
+        for message in messages:
+            message.attempts += 1
+            message.error = error
+            if message.attempts >= MAX_ATTEMPTS:
+                message.status = DiscordMessage.FAILED
+            else:
+                message.status = DiscordMessage.QUEUED
+                message.next_attempt_at = timezone.now() + RETRY_DELAY * 2 ** (message.attempts - 1)
+
+            message.save()
+
+    @staticmethod
+    def _fail(messages: List[DiscordMessage], error: str) -> None:
+        for message in messages:
+            message.attempts += 1
+            message.status = DiscordMessage.FAILED
+            message.error = error
+            message.save()
@@ -0,0 +1,38 @@
+import csv
+from typing import Any, Iterator, List, Tuple
+
+from django.db.models import Sum
+
+from extra_ep.models import PlayerReportPoints, Report
+
+
+class Echo:
+    """
+    File-like object for csv.writer, which returns the row instead of writing it
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_report_points(reports: List[Report]) -> Iterator[Tuple[Report, str, int]]:
+    """
+    (report, player name, points) from the leaderboard, sorted by player name inside of every report,
+    reports are read one by one
+    """
+    for report in reports:
+        rows = sorted(PlayerReportPoints.objects.filter(
+            report_id=report.id,
+        ).values_list(
+            'player__name',
+        ).annotate(
+            total_points=Sum('points'),
+        ).order_by())
+        for player_name, points in rows:
+            yield report, player_name, points
+
+
+def iter_csv_rows(rows: Iterator[List[Any]], delimiter: str) -> Iterator[str]:
+    writer = csv.writer(Echo(), delimiter=delimiter)
+    for row in rows:
+        yield writer.writerow(row)
@@ -1,19 +1,22 @@
 import operator
-from collections import defaultdict, namedtuple
+from abc import ABC, abstractmethod
+from collections import defaultdict
 from dataclasses import dataclass, field
-from datetime import timedelta
+from datetime import datetime, timedelta
 from functools import reduce
 from itertools import chain
-from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from typing import (
+    Any, ClassVar, DefaultDict, Dict, Generic, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple, TypeVar,
+)
 
-from django.db.models import Count
+from django.conf import settings
+from django.db.models import QuerySet
 from django.urls import reverse
 from django.utils.functional import cached_property
 
-from extra_ep.models import Consumable, ConsumableUsage, ConsumableUsageLimit, ConsumablesSet, Player, RaidRun
-
-
-Period = namedtuple('Period', ['begin', 'end'])
+from core.periods import Period, clip_periods, union_periods
+from core.scoring_config import ScoringConfig, get_scoring_config
+from extra_ep.models import Consumable, ConsumableUsage, ConsumablesSet, Player, RaidRun
 
 
 @dataclass
@@ -41,13 +44,30 @@ class UptimeConsumableUsageModel(BaseConsumableUsageModel):
 ReportType = Dict[int, Dict[int, List[BaseConsumableUsageModel]]]
 
 
+# raid_run_id: player_id: consumable_id -> count
+UsageAmounts = DefaultDict[int, DefaultDict[int, DefaultDict[int, int]]]
+# player_id: consumable_id -> periods
+UsagePeriods = DefaultDict[int, DefaultDict[int, List[Period]]]
+
+
+class UsageData(NamedTuple):
+    amounts: UsageAmounts
+    periods: UsagePeriods
+
+
 class Warning(NamedTuple):
     text: str
     player_id: Optional[int] = None
 
 
+# uptime of a consumable or a group for a player, its type depends on the scoring backend
+Uptime = TypeVar('Uptime')
+
+
 @dataclass
-class ExportReport:
+class BaseExportReport(ABC, Generic[Uptime]):
+    USAGES_CHUNK_SIZE: ClassVar[int] = 2000
+
     report_id: int
 
     warnings: Set[Warning] = field(init=False, default_factory=set)
@@ -94,8 +114,7 @@ class ExportReport:
                 ))
                 continue
 
-            consumable_uptime = self._get_player_consumable_uptime(player, required_set)
-            group_uptime = self._get_player_group_uptime(player, required_set)
+            consumable_uptime, group_uptime = self._get_player_uptime(player, required_set)
 
             for raid_run in raid_runs:
                 if player.id not in players_by_raid_run[raid_run.id]:
@@ -112,59 +131,63 @@ class ExportReport:
         return result
 
     @cached_property
-    def _consumable_sets(self) -> Dict[int, Dict[int, ConsumablesSet]]:
-        result = defaultdict(dict)
-        qs = ConsumablesSet.objects.prefetch_related('consumables', 'groups', 'groups__consumables').all()
-        for consumable_set in qs:
-            result[consumable_set.klass_id][consumable_set.role_id] = consumable_set
+    def _scoring_config(self) -> ScoringConfig:
+        return get_scoring_config()
 
-        return result
+    @property
+    def _consumable_sets(self) -> Mapping[int, Mapping[int, ConsumablesSet]]:
+        return self._scoring_config.consumable_sets
 
     @cached_property
-    def _consumable_usage_amount(self) -> Dict[int, Dict[int, Dict[int, int]]]:
+    def _usage_data(self) -> UsageData:
         """
-        raid_run_id: player_id: consumable_id -> count
+        Counts and periods of usages, collected in one pass over the usages of the report
         """
-        result = defaultdict(lambda: defaultdict(dict))
-        query = ConsumableUsage.objects.filter(
-            raid_run__report_id=self.report_id,
-        ).values(
-            'raid_run_id', 'player_id', 'consumable_id',
-        ).annotate(
-            count=Count('id'),
-        )
-        for row in query:
-            result[row['raid_run_id']][row['player_id']][row['consumable_id']] = row['count']
+        amounts: UsageAmounts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        periods: UsagePeriods = defaultdict(lambda: defaultdict(list))
 
-        return result
+        qs = self.get_usages_queryset().iterator(chunk_size=self.USAGES_CHUNK_SIZE)
+        for raid_run_id, player_id, consumable_id, begin, end in qs:
+            amounts[raid_run_id][player_id][consumable_id] += 1
+            periods[player_id][consumable_id].append(Period(begin, end))
 
-    @cached_property
-    def _consumable_usage_cache(self) -> Dict[int, Dict[int, List[ConsumableUsage]]]:
-        result = defaultdict(lambda: defaultdict(list))
+        return UsageData(amounts=amounts, periods=periods)
 
-        qs = ConsumableUsage.objects.filter(
+    def get_usages_queryset(self) -> 'QuerySet[Tuple[int, int, int, datetime, datetime]]':
+        """
+        The only query over all usages of the report, covered by an index of ConsumableUsage
+        """
+        return ConsumableUsage.objects.filter(
             raid_run__report_id=self.report_id,
+        ).values_list(
+            'raid_run_id', 'player_id', 'consumable_id', 'begin', 'end',
         )
-        for usage in qs:
-            result[usage.player_id][usage.consumable_id].append(usage)
 
-        return result
+    @property
+    def _consumable_usage_amount(self) -> UsageAmounts:
+        """
+        raid_run_id: player_id: consumable_id -> count
+        """
+        return self._usage_data.amounts
 
-    @cached_property
-    def _limits(self) -> Dict[int, Dict[int, int]]:
-        result = defaultdict(dict)
-        for limit in ConsumableUsageLimit.objects.all():
-            result[limit.raid_id][limit.consumable_id] = limit.limit
+    @property
+    def _consumable_periods(self) -> UsagePeriods:
+        """
+        player_id: consumable_id -> periods of usages
+        """
+        return self._usage_data.periods
 
-        return result
+    @property
+    def _limits(self) -> Mapping[int, Mapping[int, int]]:
+        return self._scoring_config.limits
 
     def _raid_run_process(
         self,
         raid_run: RaidRun,
         player: Player,
         required_set: ConsumablesSet,
-        consumable_uptime: Dict[int, List[Period]],
-        group_uptime: Dict[int, List[Period]],
+        consumable_uptime: Dict[int, Uptime],
+        group_uptime: Dict[int, Uptime],
     ) -> List[BaseConsumableUsageModel]:
         result: List[BaseConsumableUsageModel] = []
 
@@ -204,46 +227,96 @@ class ExportReport:
                     times_used=amount,
                 ))
             else:
-                uptime = consumable_uptime[consumable.id]
-                raid_uptime = self._get_raid_uptime(uptime, raid_run)
-
-                points, coeff = self._get_consumable_points(
+                result.append(self._get_uptime_usage_model(
+                    uptime=consumable_uptime[consumable.id],
                     raid_run=raid_run,
-                    raid_uptime=raid_uptime,
                     points=consumable.points_over_raid,
                     required=consumable.required,
-                )
-
-                points = int(round(points * raid_run.points_coefficient))
-                result.append(UptimeConsumableUsageModel(
-                    points=points,
                     consumable_id=consumable.id,
-                    periods=raid_uptime,
-                    coefficient=coeff,
                 ))
 
         if not raid_run.is_hard_mode:
             for group in required_set.groups.all():
-                uptime = group_uptime[group.id]
-                raid_uptime = self._get_raid_uptime(uptime, raid_run)
-
-                points, coeff = self._get_consumable_points(
+                result.append(self._get_uptime_usage_model(
+                    uptime=group_uptime[group.id],
                     raid_run=raid_run,
-                    raid_uptime=raid_uptime,
                     points=group.points,
                     required=group.required,
-                )
-
-                points = int(round(points * raid_run.points_coefficient))
-                result.append(UptimeConsumableUsageModel(
-                    points=points,
                     group_id=group.id,
-                    periods=raid_uptime,
-                    coefficient=coeff,
                 ))
 
         return result
 
+    @abstractmethod
+    def _get_player_uptime(
+        self,
+        player: Player,
+        required_set: ConsumablesSet,
+    ) -> Tuple[Dict[int, Uptime], Dict[int, Uptime]]:
+        """
+        Uptime of consumables and groups of the player passed to `_get_uptime_usage_model`
+        """
+        ...
+
+    @abstractmethod
+    def _get_uptime_usage_model(
+        self,
+        uptime: Uptime,
+        raid_run: RaidRun,
+        points: int,
+        required: bool,
+        consumable_id: Optional[int] = None,
+        group_id: Optional[int] = None,
+    ) -> UptimeConsumableUsageModel:
+        ...
+
+    @cached_property
+    def _all_players(self) -> Dict[int, Player]:
+        return {player.id: player for player in Player.objects.all()}
+
+
+class ExportReport(BaseExportReport[List[Period]]):
+    """
+    Uptime of the player is a list of joined periods of usages
+    """
+
+    def _get_uptime_usage_model(
+        self,
+        uptime: List[Period],
+        raid_run: RaidRun,
+        points: int,
+        required: bool,
+        consumable_id: Optional[int] = None,
+        group_id: Optional[int] = None,
+    ) -> UptimeConsumableUsageModel:
+        raid_uptime = self._get_raid_uptime(uptime, raid_run)
+
+        points, coeff = self._get_consumable_points(
+            raid_run=raid_run,
+            raid_uptime=raid_uptime,
+            points=points,
+            required=required,
+        )
+
+        points = int(round(points * raid_run.points_coefficient))
+        return UptimeConsumableUsageModel(
+            points=points,
+            consumable_id=consumable_id,
+            group_id=group_id,
+            periods=raid_uptime,
+            coefficient=coeff,
+        )
+
+    def _get_player_uptime(
+        self,
+        player: Player,
+        required_set: ConsumablesSet,
+    ) -> Tuple[Dict[int, List[Period]], Dict[int, List[Period]]]:
+        return (
+            self._get_player_consumable_uptime(player, required_set),
+            self._get_player_group_uptime(player, required_set),
+        )
+
     def _get_player_consumable_uptime(
         self,
         player: Player,
@@ -275,18 +348,7 @@ class ExportReport:
 
     @staticmethod
     def _get_raid_uptime(uptime: List[Period], raid_run: RaidRun) -> List[Period]:
-        raid_uptime = []
-
-        for period in uptime:
-            if period.end < raid_run.begin or period.begin > raid_run.end:
-                continue
-
-            raid_uptime.append(Period(
-                begin=max(raid_run.begin, period.begin),
-                end=min(raid_run.end, period.end),
-            ))
-
-        return raid_uptime
+        return clip_periods(uptime, raid_run.begin, raid_run.end)
 
     @classmethod
     def _get_consumable_points(
@@ -318,45 +380,23 @@ class ExportReport:
         return int(round(coefficient * a + b)), coefficient
 
     def _get_consumable_uptime(self, consumable: Consumable, player: Player) -> List[Period]:
-        uptime_list = []
-        consumable_usages = self._consumable_usage_cache[player.id][consumable.id]
-        for usage in consumable_usages:
-            # To prevent overlapping uptimes
-            self._insert_into_uptime_list(Period(usage.begin, usage.end), uptime_list)
-        return uptime_list
+        # To prevent overlapping uptimes
+        return union_periods(self._consumable_periods[player.id][consumable.id])
 
     @staticmethod
     def _get_total_uptime(uptime: List[Period]) -> timedelta:
         return reduce(operator.add, (period.end - period.begin for period in uptime))
 
     def _get_group_uptime(self, consumables: Iterable[Consumable], player: Player) -> List[Period]:
-        uptime: List[Period] = []
-        for consumable in consumables:
-            usages = self._consumable_usage_cache[player.id][consumable.id]
-            for usage in usages:
-                self._insert_into_uptime_list(Period(usage.begin, usage.end), uptime)
+        return union_periods(chain.from_iterable(
+            self._consumable_periods[player.id][consumable.id] for consumable in consumables
+        ))
 
-        return uptime
 
-    @classmethod
-    def _insert_into_uptime_list(
-        cls,
-        period: Period,
-        uptime_list: List[Period],
-    ) -> None:
-        for i, existing_period in enumerate(uptime_list.copy()):
-            if period.begin <= existing_period.end and existing_period.begin <= period.end:
-                uptime_list.pop(i)
-                joined_period = Period(min(period.begin, existing_period.begin), max(period.end, existing_period.end))
-                cls._insert_into_uptime_list(joined_period, uptime_list)
-                return
-
-            if period.end < existing_period.begin:
-                uptime_list.insert(i - 1, period)
-                return
-
-        uptime_list.insert(len(uptime_list), period)
+def get_export_report(report_id: int) -> 'BaseExportReport[Any]':
+    if settings.EXPORT_VECTORIZED:
+        # imported here, the module depends on this one
+        from core.export_report_numpy import VectorizedExportReport
+        return VectorizedExportReport(report_id=report_id)
 
-    @cached_property
-    def _all_players(self) -> Dict[int, Player]:
-        return {player.id: player for player in Player.objects.all()}
+    return ExportReport(report_id=report_id)
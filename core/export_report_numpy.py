@@ -0,0 +1,230 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from core.export_report import BaseExportReport, UptimeConsumableUsageModel
+from core.periods import Period
+from extra_ep.models import ConsumablesSet, Player, RaidRun
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_microseconds(value: datetime) -> int:
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_microseconds(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def union_arrays(begins: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The same as `union_periods`, but for arrays of begins and ends
+    """
+    if not len(begins):
+        return begins, ends
+
+    order = np.lexsort((ends, begins))
+    begins = begins[order]
+    ends = ends[order]
+
+    # a period starts a new joined one when it begins after all previous periods end
+    reach = np.maximum.accumulate(ends)
+    starts = np.flatnonzero(np.concatenate(([True], begins[1:] > reach[:-1])))
+    return begins[starts], np.maximum.reduceat(ends, starts)
+
+
+class RaidRunArrays(NamedTuple):
+    positions: Dict[int, int]  # raid_run_id -> position in the arrays
+    begins: np.ndarray
+    ends: np.ndarray
+    seconds: np.ndarray
+    required_uptime: np.ndarray
+    minimum_uptime: np.ndarray
+    points_coefficient: np.ndarray
+
+
+class ScoredUptime(NamedTuple):
+    """
+    Joined uptime of a player with points and coefficients for every raid run of the report
+    """
+    begins: np.ndarray
+    ends: np.ndarray
+    has_periods: np.ndarray
+    points: np.ndarray
+    coefficients: np.ndarray
+
+
+class VectorizedExportReport(BaseExportReport[ScoredUptime]):
+    """
+    ExportReport which keeps usages as arrays of microseconds and scores uptime for all raid runs at once.
+    Enabled by `settings.EXPORT_VECTORIZED`, gives the same result as ExportReport.
+    """
+
+    @cached_property
+    def _usage_arrays(self) -> Dict[int, Dict[int, Tuple[np.ndarray, np.ndarray]]]:
+        """
+        player_id: consumable_id -> (begins, ends)
+        """
+        result: Dict[int, Dict[int, Tuple[np.ndarray, np.ndarray]]] = defaultdict(dict)
+        for player_id, player_periods in self._consumable_periods.items():
+            for consumable_id, periods in player_periods.items():
+                if not periods:
+                    continue
+
+                array = np.array(
+                    [(to_microseconds(begin), to_microseconds(end)) for begin, end in periods],
+                    dtype=np.int64,
+                )
+                result[player_id][consumable_id] = (array[:, 0], array[:, 1])
+
+        return result
+
+    @cached_property
+    def _raid_run_arrays(self) -> RaidRunArrays:
+        raid_runs = list(RaidRun.objects.filter(report_id=self.report_id).order_by('begin'))
+        begins = np.array([to_microseconds(raid_run.begin) for raid_run in raid_runs], dtype=np.int64)
+        ends = np.array([to_microseconds(raid_run.end) for raid_run in raid_runs], dtype=np.int64)
+
+        return RaidRunArrays(
+            positions={raid_run.id: i for i, raid_run in enumerate(raid_runs)},
+            begins=begins,
+            ends=ends,
+            seconds=(ends - begins) / 1e6,
+            required_uptime=np.array([raid_run.required_uptime for raid_run in raid_runs], dtype=np.float64),
+            minimum_uptime=np.array([raid_run.minimum_uptime for raid_run in raid_runs], dtype=np.float64),
+            points_coefficient=np.array([raid_run.points_coefficient for raid_run in raid_runs], dtype=np.float64),
+        )
+
+    def _get_player_uptime(
+        self,
+        player: Player,
+        required_set: ConsumablesSet,
+    ) -> Tuple[Dict[int, ScoredUptime], Dict[int, ScoredUptime]]:
+        return (
+            self._score_player_consumable_uptime(player, required_set),
+            self._score_player_group_uptime(player, required_set),
+        )
+
+    def _score_player_consumable_uptime(
+        self,
+        player: Player,
+        required_set: ConsumablesSet,
+    ) -> Dict[int, ScoredUptime]:
+        result = {}
+
+        for consumable in required_set.consumables.all():
+            if consumable.usage_based_item:
+                continue
+
+            begins, ends = self._get_player_arrays(player, [consumable.id])
+            result[consumable.id] = self._score_uptime(begins, ends, consumable.points_over_raid, consumable.required)
+
+        return result
+
+    def _score_player_group_uptime(
+        self,
+        player: Player,
+        required_set: ConsumablesSet,
+    ) -> Dict[int, ScoredUptime]:
+        result = {}
+
+        for group in required_set.groups.all():
+            consumable_ids = [consumable.id for consumable in group.consumables.all()]
+            begins, ends = self._get_player_arrays(player, consumable_ids)
+            result[group.id] = self._score_uptime(begins, ends, group.points, group.required)
+
+        return result
+
+    def _get_player_arrays(self, player: Player, consumable_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        player_arrays = self._usage_arrays.get(player.id, {})
+        arrays = [player_arrays[consumable_id] for consumable_id in consumable_ids if consumable_id in player_arrays]
+        if not arrays:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        return np.concatenate([begins for begins, _ in arrays]), np.concatenate([ends for _, ends in arrays])
+
+    def _score_uptime(self, begins: np.ndarray, ends: np.ndarray, points: int, required: bool) -> ScoredUptime:
+        """
+        Vectorized `_get_raid_uptime` and `_get_consumable_points` for all raid runs of the report
+        """
+        raid_runs = self._raid_run_arrays
+        begins, ends = union_arrays(begins, ends)
+
+        # periods x raid runs
+        in_raid_run = (ends[:, None] >= raid_runs.begins) & (begins[:, None] <= raid_runs.ends)
+        clipped = np.minimum(ends[:, None], raid_runs.ends) - np.maximum(begins[:, None], raid_runs.begins)
+        total = np.where(in_raid_run, clipped, 0).sum(axis=0)
+        has_periods = in_raid_run.any(axis=0)
+
+        minimum_uptime = raid_runs.minimum_uptime if required else np.zeros_like(raid_runs.minimum_uptime)
+        # the same operations as in `_get_consumable_points` to get the same floats
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coefficients = (total / 1e6) / raid_runs.seconds
+
+            a = points / (raid_runs.required_uptime - minimum_uptime)
+            b = - a * minimum_uptime
+            between = np.rint(coefficients * a + b)
+
+            a = points / raid_runs.minimum_uptime
+            b = - points
+            below = np.rint(coefficients * a + b)
+
+        raid_points = np.where(
+            coefficients >= raid_runs.required_uptime,
+            points,
+            np.where(coefficients >= minimum_uptime, between, below),
+        )
+        raid_points = np.where(has_periods, raid_points, - points if required else 0)
+        raid_points = np.rint(raid_points * raid_runs.points_coefficient)
+
+        return ScoredUptime(
+            begins=begins,
+            ends=ends,
+            has_periods=has_periods,
+            points=raid_points,
+            coefficients=coefficients,
+        )
+
+    def _get_uptime_usage_model(
+        self,
+        uptime: ScoredUptime,
+        raid_run: RaidRun,
+        points: int,
+        required: bool,
+        consumable_id: Optional[int] = None,
+        group_id: Optional[int] = None,
+    ) -> UptimeConsumableUsageModel:
+        i = self._raid_run_arrays.positions[raid_run.id]
+        if not uptime.has_periods[i]:
+            return UptimeConsumableUsageModel(
+                points=int(uptime.points[i]),
+                consumable_id=consumable_id,
+                group_id=group_id,
+                periods=[],
+                coefficient=0,
+            )
+
+        begin = self._raid_run_arrays.begins[i]
+        end = self._raid_run_arrays.ends[i]
+        mask = (uptime.ends >= begin) & (uptime.begins <= end)
+        periods = [
+            Period(from_microseconds(period_begin), from_microseconds(period_end))
+            for period_begin, period_end in zip(
+                np.maximum(uptime.begins[mask], begin),
+                np.minimum(uptime.ends[mask], end),
+            )
+        ]
+
+        return UptimeConsumableUsageModel(
+            points=int(uptime.points[i]),
+            consumable_id=consumable_id,
+            group_id=group_id,
+            periods=periods,
+            coefficient=float(uptime.coefficients[i]),
+        )
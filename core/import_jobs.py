@@ -0,0 +1,97 @@
+import codecs
+import traceback
+from datetime import timedelta
+from typing import Optional
+
+import chardet
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.batch_scoring import BatchScorer
+from core.combat_log import open_log_file
+from core.import_report import ParallelReportImporter, ReportImporter
+from extra_ep.models import ImportJob
+
+# jobs of a worker which died while importing are taken again after this time. The import is one transaction,
+# so nothing of the dead worker is left in the database. A slow worker which is still alive is not a problem
+# either, the import replaces raid runs of the report, so the report is never imported twice.
+RUNNING_TIMEOUT = timedelta(hours=1)
+
+
+class ScoringError(Exception):
+    """
+    The report is imported, but could not be scored
+    """
+
+
+def claim_job() -> Optional[ImportJob]:
+    """
+    Take the oldest queued job. Rows locked by other workers are skipped, so any amount
+    of workers could run in parallel.
+    """
+    now = timezone.now()
+    is_due = Q(status=ImportJob.QUEUED) | Q(status=ImportJob.RUNNING, started_at__lt=now - RUNNING_TIMEOUT)
+
+    with transaction.atomic():
+        job = ImportJob.objects.select_for_update(
+            skip_locked=True,
+        ).filter(
+            is_due,
+        ).order_by('id').first()
+
+        if job is None:
+            return None
+
+        # SQLite has no row locks, so the status check in UPDATE is what guarantees a single owner
+        claimed = ImportJob.objects.filter(
+            is_due,
+            id=job.id,
+        ).update(
+            status=ImportJob.RUNNING,
+            started_at=now,
+            updated_at=now,
+        )
+
+    if not claimed:
+        return None
+
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job: ImportJob) -> None:
+    try:
+        with job.log_file.open('rb') as log_file:
+            log_stream = open_log_file(log_file)
+            encoding = chardet.detect(log_stream.read(1000))['encoding']
+            log_stream.seek(0)
+
+            # archives could not be split into byte ranges, they are imported sequentially
+            importer: ReportImporter
+            if settings.IMPORT_PROCESSES > 1 and log_stream is log_file:
+                importer = ParallelReportImporter(
+                    report_id=job.report_id,
+                    log_path=job.log_file.path,
+                    encoding=encoding,
+                    processes=settings.IMPORT_PROCESSES,
+                )
+            else:
+                importer = ReportImporter(report_id=job.report_id, log_file=codecs.iterdecode(log_stream, encoding))
+
+            importer.process()
+
+        # scores the report for the leaderboard and the report page
+        scored_report, = BatchScorer().process([job.report_id])
+        if scored_report.error:
+            raise ScoringError(scored_report.error)
+    except Exception:  # noqa: B902
+        job.status = ImportJob.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = ImportJob.DONE
+        job.log_file.delete(save=False)
+
+    job.finished_at = timezone.now()
+    job.save()
@@ -1,135 +1,211 @@
+import multiprocessing
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from functools import lru_cache
-from typing import Any, Dict, List, TextIO, Set
+from itertools import repeat
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
 
+from django.db import transaction
 from django.utils.functional import cached_property
 
-from core.utils import parse_datetime_str
+from core.combat_log import LOG_END, PLAYERS_SEEN, CombatLogReader, LogEvent, split_log
+from core.scoring_config import ScoringConfig, get_scoring_config
+from core.utils import CombatLogTimeParser
 from extra_ep.models import Boss, Consumable, ConsumableUsage, Player, RaidRun, Report
 
 
 class ReportImporter:
     SERVER_POSTFIX = '-Пламегор'
-
-    def __init__(self, report_id: int, log_file: TextIO) -> None:
+    BATCH_SIZE = 1000
+
+    # event: amount of fields needed to process it
+    EVENT_FIELDS = {
+        'ENCOUNTER_START': 1,
+        'ENCOUNTER_END': 1,
+        'SPELL_CAST_SUCCESS': 9,
+        'SPELL_AURA_APPLIED': 9,
+        'SPELL_AURA_REMOVED': 9,
+        'COMBATANT_INFO': 1,
+    }
+
+    def __init__(self, report_id: int, log_file: Optional[Iterable[str]], batch_size: int = BATCH_SIZE) -> None:
         self.report_id = report_id
         self.log_file = log_file
+        self.batch_size = batch_size
+
+        self._parse_datetime = CombatLogTimeParser()
+
+        # players are resolved in bulk right before they are needed in the database, until then
+        # the importer refers to them by name
+        self._players: Dict[str, Player] = {}
 
-        # player_id: {consumable_id: ConsumableUsage}
-        self._unfinished_consumables: Dict[int, Dict[int, ConsumableUsage]] = defaultdict(dict)
+        # finished usages with player names, waiting to be written with bulk_create
+        self._finished_usages: List[Tuple[str, ConsumableUsage]] = []
 
-        self._player_map: Dict[str, Player] = {}
+        # player_name: {consumable_id: ConsumableUsage}
+        self._unfinished_consumables: Dict[str, Dict[int, ConsumableUsage]] = defaultdict(dict)
+
+        # player guid: player_name
+        self._player_map: Dict[str, str] = {}
         self._player_usage_map: Dict[str, List[ConsumableUsage]] = defaultdict(list)
 
-        self._consumable_throttling_map: Dict[Player, Dict[Consumable, List[datetime]]] = (
-            defaultdict(lambda: defaultdict(list))
-        )
-        self._players_in_raid: Set[Player] = set()
+        # (player_name, consumable_id): last counted usage time rounded to seconds. Rows go in time order,
+        # so only the last counted second could repeat and one value per pair is enough
+        self._consumable_throttling_map: Dict[Tuple[str, int], datetime] = {}
+        # names of players seen since the raid started, resolved to players when it ends
+        self._players_in_raid: Set[str] = set()
         self._track_players = False
 
     def process(self) -> None:
-        raid_run = None
-        datetime_str = None
-        # yes, I know how hacky it is, but I don't want to change type :(
-        iterator = self.log_file.readlines() if hasattr(self.log_file, 'readlines') else self.log_file
-        for row_raw in iterator:
-            row = row_raw.split(',')
+        with transaction.atomic():
+            # a job taken again after RUNNING_TIMEOUT could still be imported by a slow worker. The second import
+            # waits for the lock of the report until the first one commits and replaces its raid runs
+            Report.objects.select_for_update().filter(id=self.report_id).first()
+            RaidRun.objects.filter(report_id=self.report_id).delete()
+            self._process()
+
+        self._players = {}
+
+    def _read_events(self) -> Iterable[LogEvent]:
+        # rows are read one by one, so the whole log is never kept in memory
+        return self._reader.read(self.log_file)
+
+    def _process(self) -> None:
+        raid_run: Optional[RaidRun] = None
+        last_datetime_str = None
+        for datetime_str, event, row, row_raw in self._read_events():
+            if event == PLAYERS_SEEN:
+                if self._track_players:
+                    self._players_in_raid.update(row)
+                continue
+
+            if event == LOG_END:
+                last_datetime_str = datetime_str
+                continue
+
             if raid_run is None:
                 raid_run = self._create_unknown_raid_run()
 
-            datetime_str, event = row[0].split('  ')
-
-            if event == 'ENCOUNTER_START':
-                self._track_players = True
-                if raid_run.begin is None:
-                    raid_run.begin = parse_datetime_str(datetime_str)
-                    raid_run.save()
-
-                boss = Boss.objects.filter(encounter_id=int(row[1])).first()
-                if boss is None:
-                    continue
-
-                if raid_run.raid_id is None:
-                    raid_run.raid_id = boss.raid_id
-                    raid_run.required_uptime = boss.raid.default_required_uptime
-                    raid_run.minimum_uptime = boss.raid.default_minimum_uptime
-                    raid_run.points_coefficient = boss.raid.default_points_coefficient
-                    raid_run.is_hard_mode = boss.raid.default_is_hard_mode
-                    raid_run.begin = parse_datetime_str(datetime_str)
-                    raid_run.save()
-
-                if raid_run.raid_id != boss.raid_id:
-                    raid_run.end = parse_datetime_str(datetime_str)
-                    raid_run.save()
-
-                    raid_run = self._create_unknown_raid_run()
-                    raid_run.raid_id = boss.raid_id
-                    raid_run.save()
-
-            elif event == 'ENCOUNTER_END':
-                boss = Boss.objects.filter(encounter_id=int(row[1])).first()
-                if boss is None:
-                    continue
-
-                time = parse_datetime_str(datetime_str)
-
-                if boss.raid_end:
-                    self._track_players = False
-                    raid_run.end = time
-                    raid_run.players.add(*self._players_in_raid)
-                    self._players_in_raid = set()
-                    raid_run.save()
-
-                    raid_run = None
-
-            elif event in ('SPELL_CAST_SUCCESS', 'SPELL_AURA_APPLIED'):
-                self._make_consumable_usage(
-                    row=row,
-                    raid_run=raid_run,
-                    time=parse_datetime_str(datetime_str),
-                    is_aura=(event == 'SPELL_AURA_APPLIED'),
-                )
-
-            elif event == 'SPELL_AURA_REMOVED':
-                self._finalize_consumable(row, parse_datetime_str(datetime_str))
-
-            elif event == 'COMBATANT_INFO':
-                self._track_combatant_auras(row, row_raw, raid_run, parse_datetime_str(datetime_str))
+            raid_run = self._process_event(raid_run, datetime_str, event, row, row_raw)
 
         if raid_run:
-            if raid_run.raid_id is not None:
-                raid_run.end = parse_datetime_str(datetime_str)
-                raid_run.players.add(*self._players_in_raid)
-                raid_run.save()
-            else:
-                raid_run.delete()
+            self._end_log(raid_run, last_datetime_str)
 
         self._postprocess_report()
 
-    def _postprocess_report(self):
-        for player_id, usages in self._player_usage_map.items():
-            player = self._player_map.get(player_id)
-            if player is None:
+    def _process_event(
+        self,
+        raid_run: RaidRun,
+        datetime_str: str,
+        event: str,
+        row: List[str],
+        row_raw: str,
+    ) -> Optional[RaidRun]:
+        """
+        Returns the raid run of the next events, None when the raid is over
+        """
+        if event == 'ENCOUNTER_START':
+            return self._start_encounter(raid_run, datetime_str, row)
+
+        if event == 'ENCOUNTER_END':
+            return self._end_encounter(raid_run, datetime_str, row)
+
+        time = self._parse_datetime(datetime_str)
+        if event in ('SPELL_CAST_SUCCESS', 'SPELL_AURA_APPLIED'):
+            self._make_consumable_usage(
+                row=row,
+                raid_run=raid_run,
+                time=time,
+                is_aura=(event == 'SPELL_AURA_APPLIED'),
+            )
+
+        elif event == 'SPELL_AURA_REMOVED':
+            self._finalize_consumable(row, time)
+
+        elif event == 'COMBATANT_INFO':
+            self._track_combatant_auras(row, row_raw, raid_run, time)
+
+        return raid_run
+
+    def _start_encounter(self, raid_run: RaidRun, datetime_str: str, row: List[str]) -> RaidRun:
+        self._track_players = True
+        if raid_run.begin is None:
+            raid_run.begin = self._parse_datetime(datetime_str)
+            raid_run.save()
+
+        boss = self._bosses.get(int(row[0]))
+        if boss is None:
+            return raid_run
+
+        if raid_run.raid_id is None:
+            raid_run.raid_id = boss.raid_id
+            raid_run.required_uptime = boss.raid.default_required_uptime
+            raid_run.minimum_uptime = boss.raid.default_minimum_uptime
+            raid_run.points_coefficient = boss.raid.default_points_coefficient
+            raid_run.is_hard_mode = boss.raid.default_is_hard_mode
+            raid_run.begin = self._parse_datetime(datetime_str)
+            raid_run.save()
+
+        if raid_run.raid_id != boss.raid_id:
+            raid_run.end = self._parse_datetime(datetime_str)
+            raid_run.save()
+
+            raid_run = self._create_unknown_raid_run()
+            raid_run.raid_id = boss.raid_id
+            raid_run.save()
+
+        return raid_run
+
+    def _end_encounter(self, raid_run: RaidRun, datetime_str: str, row: List[str]) -> Optional[RaidRun]:
+        boss = self._bosses.get(int(row[0]))
+        if boss is None or not boss.raid_end:
+            return raid_run
+
+        self._track_players = False
+        raid_run.end = self._parse_datetime(datetime_str)
+        self._add_players_in_raid(raid_run)
+        raid_run.save()
+
+        return None
+
+    def _end_log(self, raid_run: RaidRun, last_datetime_str: Optional[str]) -> None:
+        """
+        The log is over before the last boss of the raid
+        """
+        if raid_run.raid_id is None:
+            raid_run.delete()
+            return
+
+        # LOG_END is emitted when there are any other events
+        if last_datetime_str is not None:
+            raid_run.end = self._parse_datetime(last_datetime_str)
+        self._add_players_in_raid(raid_run)
+        raid_run.save()
+
+    def _postprocess_report(self) -> None:
+        for player_guid, usages in self._player_usage_map.items():
+            player_name = self._player_map.get(player_guid)
+            if player_name is None:
                 continue
 
             for usage in usages:
-                usage.player = player
-                usage.save()
+                self._save_usage(player_name, usage)
 
         qs = RaidRun.objects.filter(report_id=self.report_id).order_by('-begin')
 
         last_raid = qs.first()
         last_raid_end = last_raid.end if last_raid else datetime.now()
 
-        for consumables in self._unfinished_consumables.values():
+        for player_name, consumables in self._unfinished_consumables.items():
             for cons_usage in consumables.values():
                 cons_usage.end = last_raid_end
-                try:
-                    cons_usage.save()
-                except ValueError:
+                if cons_usage.raid_run.pk is None:
+                    # raid run was deleted as unknown one
                     cons_usage.raid_run = last_raid
-                    cons_usage.save()
+                self._save_usage(player_name, cons_usage)
+
+        self._flush_usages(force=True)
 
         if not qs.exists():
             return
@@ -141,20 +217,63 @@ class ReportImporter:
 
         report.save()
 
+    def _save_usage(self, player_name: str, usage: ConsumableUsage) -> None:
+        self._finished_usages.append((player_name, usage))
+        self._flush_usages()
+
+    def _flush_usages(self, force: bool = False) -> None:
+        if not force and len(self._finished_usages) < self.batch_size:
+            return
+
+        self._resolve_players({player_name for player_name, _ in self._finished_usages})
+
+        usages = []
+        for player_name, usage in self._finished_usages:
+            # usages of the deleted unknown raid run would be removed by cascade anyway
+            if usage.raid_run.pk is None:
+                continue
+
+            usage.player = self._players[player_name]
+            usages.append(usage)
+
+        ConsumableUsage.objects.bulk_create(usages, batch_size=self.batch_size)
+        self._finished_usages = []
+
+    def _resolve_players(self, player_names: Set[str]) -> None:
+        missing_names = player_names - self._players.keys()
+        if not missing_names:
+            return
+
+        for player in Player.objects.filter(name__in=missing_names):
+            self._players[player.name] = player
+
+        new_names = missing_names - self._players.keys()
+        if not new_names:
+            return
+
+        # the same player could be created by a concurrent import, so conflicts are ignored and players are fetched
+        Player.objects.bulk_create([Player(name=player_name) for player_name in new_names], ignore_conflicts=True)
+        for player in Player.objects.filter(name__in=new_names):
+            self._players[player.name] = player
+
     def _create_unknown_raid_run(self) -> RaidRun:
         return RaidRun.objects.create(
             report_id=self.report_id,
         )
 
-    def _make_consumable_usage(self, row: List[Any], raid_run: RaidRun, time: datetime, is_aura: bool) -> None:
-        player_name = row[2].strip('"')
+    def _add_players_in_raid(self, raid_run: RaidRun) -> None:
+        player_names = {self._get_player_name(player_name) for player_name in self._players_in_raid}
+        self._resolve_players(player_names)
+        raid_run.players.add(*(self._players[player_name] for player_name in player_names))
+        self._players_in_raid = set()
+
+    def _make_consumable_usage(self, row: List[str], raid_run: RaidRun, time: datetime, is_aura: bool) -> None:
+        player_name = row[1].strip('"')
         if not player_name.endswith(self.SERVER_POSTFIX):
             return
 
-        player = self._get_or_create_player(player_name)
-        if self._track_players:
-            self._players_in_raid.add(player)
-        consumable = self._all_consumables.get(int(row[9]))
+        player_name = self._get_player_name(player_name)
+        consumable = self._all_consumables.get(int(row[8]))
 
         if consumable is None:
             return
@@ -162,32 +281,32 @@ class ReportImporter:
         if is_aura and not consumable.check_by_aura_apply:
             return
 
-        self._player_map[row[1]] = player
+        self._player_map[row[0]] = player_name
 
         aprox_usage_time = time.replace(microsecond=0)
-        if aprox_usage_time in self._consumable_throttling_map[player][consumable]:
+        throttling_key = (player_name, consumable.id)
+        if self._consumable_throttling_map.get(throttling_key) == aprox_usage_time:
             return
 
-        self._consumable_throttling_map[player][consumable].append(aprox_usage_time)
+        self._consumable_throttling_map[throttling_key] = aprox_usage_time
 
-        existing_unfinished_usage = self._unfinished_consumables[player.id].get(consumable.id)
+        existing_unfinished_usage = self._unfinished_consumables[player_name].get(consumable.id)
         if existing_unfinished_usage is not None:
             if is_aura and existing_unfinished_usage.begin + consumable.duration_timedelta > time:
                 # previous aura did not end
                 return
 
             existing_unfinished_usage.end = time
-            existing_unfinished_usage.save()
+            self._save_usage(player_name, existing_unfinished_usage)
 
         consumable_usage = ConsumableUsage(
-            player=player,
             raid_run=raid_run,
             consumable=consumable,
             begin=time,
         )
-        self._unfinished_consumables[player.id][consumable.id] = consumable_usage
+        self._unfinished_consumables[player_name][consumable.id] = consumable_usage
 
-    def _track_combatant_auras(self, row: List[Any], row_raw: str, raid_run: RaidRun, time: datetime) -> None:
+    def _track_combatant_auras(self, row: List[str], row_raw: str, raid_run: RaidRun, time: datetime) -> None:
         auras = row_raw[row_raw.rfind('[') + 1:]
         auras = auras.strip()
         auras = auras[:-1]
@@ -207,38 +326,92 @@ class ReportImporter:
             if consumable is None or not consumable.is_world_buff:
                 continue
 
-            self._player_usage_map[row[1]].append(ConsumableUsage(
+            self._player_usage_map[row[0]].append(ConsumableUsage(
                 raid_run=raid_run,
                 consumable=consumable,
                 begin=time,
                 end=time,
             ))
 
-    def _finalize_consumable(self, row: List[Any], time: datetime) -> None:
-        consumable = self._all_consumables.get(int(row[9]))
+    def _finalize_consumable(self, row: List[str], time: datetime) -> None:
+        consumable = self._all_consumables.get(int(row[8]))
 
         if consumable is None:
             return
 
-        player = self._get_or_create_player(row[2].strip('"'))
-        self._player_map[row[1]] = player
+        player_name = self._get_player_name(row[1].strip('"'))
+        self._player_map[row[0]] = player_name
 
-        unfinished_usage = self._unfinished_consumables[player.id].get(consumable.id)
+        unfinished_usage = self._unfinished_consumables[player_name].get(consumable.id)
         if unfinished_usage is None:
             return
 
         unfinished_usage.end = time
-        unfinished_usage.save()
-        del self._unfinished_consumables[player.id][consumable.id]
+        self._save_usage(player_name, unfinished_usage)
+        del self._unfinished_consumables[player_name][consumable.id]
+
+    @staticmethod
+    def _get_player_name(player_name: str) -> str:
+        # Name-Server -> Name
+        return player_name.partition('-')[0]
 
-    @lru_cache(maxsize=None)
-    def _get_or_create_player(self, player_name: str) -> Player:
-        if '-' in player_name:
-            player_name, _ = player_name.split('-')
+    @cached_property
+    def _scoring_config(self) -> ScoringConfig:
+        # the same snapshot for the whole import
+        return get_scoring_config()
 
-        player, _ = Player.objects.get_or_create(name=player_name)
-        return player
+    @property
+    def _all_consumables(self) -> Mapping[int, Consumable]:
+        return self._scoring_config.consumables_by_spell_id
+
+    @cached_property
+    def _reader(self) -> CombatLogReader:
+        return CombatLogReader(self.EVENT_FIELDS, self._tracked_spell_ids, self.SERVER_POSTFIX)
 
     @cached_property
-    def _all_consumables(self) -> Dict[int, Consumable]:
-        return {consumable.spell_id: consumable for consumable in Consumable.objects.all()}
+    def _tracked_spell_ids(self) -> FrozenSet[str]:
+        # strings, to check raw fields of the log without converting them
+        return frozenset(str(spell_id) for spell_id in self._all_consumables)
+
+    @property
+    def _bosses(self) -> Mapping[int, Boss]:
+        return self._scoring_config.bosses
+
+
+class ParallelReportImporter(ReportImporter):
+    """
+    Reads segments of the log file in a process pool and feeds their events to the importer in the log order,
+    so the result is the same as of the sequential import.
+    """
+
+    # more segments than processes, so the import could start before the slowest segment is read
+    SEGMENTS_PER_PROCESS = 4
+
+    def __init__(
+        self,
+        report_id: int,
+        log_path: str,
+        encoding: str,
+        processes: Optional[int] = None,
+        batch_size: int = ReportImporter.BATCH_SIZE,
+    ) -> None:
+        super().__init__(report_id=report_id, log_file=None, batch_size=batch_size)
+        self.log_path = log_path
+        self.encoding = encoding
+        self.processes = processes or os.cpu_count() or 1
+
+    def _read_events(self) -> Iterator[LogEvent]:
+        starts, ends = zip(*split_log(self.log_path, self.processes * self.SEGMENTS_PER_PROCESS))
+
+        # spawn, not fork: forked children would share the database connection of the importer
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=context) as executor:
+            segments = executor.map(
+                self._reader.read_segment,
+                repeat(self.log_path),
+                starts,
+                ends,
+                repeat(self.encoding),
+            )
+            for events in segments:
+                yield from events
@@ -0,0 +1,70 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Mapping, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, QuerySet, Sum
+
+from core.export_report import ReportType
+from extra_ep.models import PlayerReportPoints, RaidRun, Report
+
+BATCH_SIZE = 1000
+
+
+def update_reports_points(results: Mapping[int, ReportType]) -> None:
+    """
+    Replace PlayerReportPoints of the reports by the sums of their ExportReport results,
+    with one delete and one insert
+    """
+    raids = dict(RaidRun.objects.filter(report_id__in=results.keys()).values_list('id', 'raid_id'))
+
+    points: Dict[Tuple[int, int, Optional[int]], int] = defaultdict(int)
+    for report_id, data in results.items():
+        for player_id, raid_run_data in data.items():
+            for raid_run_id, usage_models in raid_run_data.items():
+                key = (report_id, player_id, raids.get(raid_run_id))
+                points[key] += sum(usage_model.points for usage_model in usage_models)
+
+    with transaction.atomic():
+        # the lock keeps two processes scoring the same report from mixing their rows,
+        # reports are locked in the same order to avoid deadlocks
+        report_ids = set(Report.objects.select_for_update().filter(
+            id__in=results.keys(),
+        ).order_by('id').values_list('id', flat=True))
+
+        PlayerReportPoints.objects.filter(report_id__in=report_ids).delete()
+        PlayerReportPoints.objects.bulk_create(
+            [
+                PlayerReportPoints(report_id=report_id, player_id=player_id, raid_id=raid_id, points=player_points)
+                for (report_id, player_id, raid_id), player_points in points.items()
+                if report_id in report_ids
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def get_standings(
+    static: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    flushed: Optional[bool] = None,
+) -> 'QuerySet[PlayerReportPoints]':
+    """
+    Total points of players over the filtered reports, the best first
+    """
+    qs = PlayerReportPoints.objects.all()
+    if static is not None:
+        qs = qs.filter(report__static=static)
+    if date_from is not None:
+        qs = qs.filter(report__raid_day__gte=date_from)
+    if date_to is not None:
+        qs = qs.filter(report__raid_day__lte=date_to)
+    if flushed is not None:
+        qs = qs.filter(report__flushed=flushed)
+
+    return qs.values(
+        'player_id', 'player__name', 'player__klass__color',
+    ).annotate(
+        total_points=Sum('points'),
+        reports=Count('report_id', distinct=True),
+    ).order_by('-total_points', 'player__name')
@@ -0,0 +1,39 @@
+from collections import namedtuple
+from datetime import datetime
+from typing import Iterable, List
+
+Period = namedtuple('Period', ['begin', 'end'])
+
+
+def union_periods(periods: Iterable[Period]) -> List[Period]:
+    """
+    Join overlapping and touching periods, the result is sorted and has no overlaps.
+    """
+    result: List[Period] = []
+    for begin, end in sorted(periods):
+        if result and begin <= result[-1].end:
+            if end > result[-1].end:
+                result[-1] = Period(result[-1].begin, end)
+            continue
+
+        result.append(Period(begin, end))
+
+    return result
+
+
+def clip_periods(periods: List[Period], begin: datetime, end: datetime) -> List[Period]:
+    """
+    Cut the result of `union_periods` to the [begin, end] range.
+    """
+    result = []
+    for period in periods:
+        if period.end < begin:
+            continue
+
+        # periods are sorted, the rest of them are after the range too
+        if period.begin > end:
+            break
+
+        result.append(Period(max(begin, period.begin), min(end, period.end)))
+
+    return result
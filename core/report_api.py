@@ -0,0 +1,137 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from django.utils.http import quote_etag
+
+from core.export_report import BaseConsumableUsageModel, ConsumableUsageModel, UptimeConsumableUsageModel
+from core.report_cache import ReportResult, get_reports_version
+from core.scoring_config import get_scoring_config
+from extra_ep.models import Player, RaidRun, Report
+
+# changed on incompatible changes of the output, clients request /api/v<version>/
+API_VERSION = 1
+
+
+def get_report_etag(report: Report) -> str:
+    """
+    Strong ETag of `serialize_report` output, computed without scoring the report
+    """
+    etag_data = f'{API_VERSION}:{serialize_report_fields(report)}:{get_reports_version([report.id])}'
+    return quote_etag(hashlib.sha1(etag_data.encode()).hexdigest())
+
+
+def get_reports_etag(reports: List[Report]) -> str:
+    etag_data = f'{API_VERSION}:{[serialize_report_fields(report) for report in reports]}'
+    return quote_etag(hashlib.sha1(etag_data.encode()).hexdigest())
+
+
+def serialize_report(report: Report, result: ReportResult) -> Dict[str, Any]:
+    """
+    ExportReport result with raid runs, players and consumables it refers to.
+    The output depends only on the data covered by `get_report_etag`.
+    """
+    scoring_config = get_scoring_config()
+    raid_runs = list(RaidRun.objects.select_related('raid').filter(report_id=report.id).order_by('begin', 'id'))
+    players = list(Player.objects.filter(id__in=result.data.keys()).order_by('name'))
+
+    consumable_ids = set()
+    group_ids = set()
+    for raid_run_data in result.data.values():
+        for usage_models in raid_run_data.values():
+            for usage_model in usage_models:
+                consumable_ids.add(usage_model.consumable_id)
+                group_ids.add(usage_model.group_id)
+
+    return {
+        'report': serialize_report_fields(report),
+        'raid_runs': [
+            {
+                'id': raid_run.id,
+                'raid_id': raid_run.raid_id,
+                'raid': raid_run.raid.name if raid_run.raid else None,
+                'begin': _serialize_datetime(raid_run.begin),
+                'end': _serialize_datetime(raid_run.end),
+                'required_uptime': raid_run.required_uptime,
+                'minimum_uptime': raid_run.minimum_uptime,
+                'points_coefficient': raid_run.points_coefficient,
+                'is_hard_mode': raid_run.is_hard_mode,
+            }
+            for raid_run in raid_runs
+        ],
+        'players': [
+            {
+                'id': player.id,
+                'name': player.name,
+                'points': sum(
+                    usage_model.points
+                    for usage_models in result.data[player.id].values()
+                    for usage_model in usage_models
+                ),
+                'raid_runs': [
+                    {
+                        'raid_run_id': raid_run_id,
+                        'points': sum(usage_model.points for usage_model in usage_models),
+                        'usages': [_serialize_usage_model(usage_model) for usage_model in usage_models],
+                    }
+                    for raid_run_id, usage_models in result.data[player.id].items()
+                ],
+            }
+            for player in players
+        ],
+        'consumables': [
+            {
+                'id': consumable.id,
+                'name': consumable.name,
+                'spell_id': consumable.spell_id,
+                'item_id': consumable.item_id,
+            }
+            for consumable_id, consumable in sorted(scoring_config.consumables.items())
+            if consumable_id in consumable_ids
+        ],
+        'groups': [
+            {
+                'id': group.id,
+                'name': group.name,
+                'consumable_ids': sorted(consumable.id for consumable in group.consumables.all()),
+            }
+            for group_id, group in sorted(scoring_config.groups.items())
+            if group_id in group_ids
+        ],
+        'warnings': [
+            {'text': warning.text, 'player_id': warning.player_id}
+            for warning in sorted(result.warnings, key=lambda warning: (warning.text, warning.player_id or 0))
+        ],
+    }
+
+
+def serialize_report_fields(report: Report) -> Dict[str, Any]:
+    return {
+        'id': report.id,
+        'static': report.static,
+        'raid_day': report.raid_day.isoformat() if report.raid_day else None,
+        'raid_name': report.raid_name,
+        'flushed': report.flushed,
+        'updated_at': _serialize_datetime(report.updated_at),
+    }
+
+
+def _serialize_usage_model(usage_model: BaseConsumableUsageModel) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        'consumable_id': usage_model.consumable_id,
+        'group_id': usage_model.group_id,
+        'points': usage_model.points,
+    }
+    if isinstance(usage_model, ConsumableUsageModel):
+        result['times_used'] = usage_model.times_used
+    if isinstance(usage_model, UptimeConsumableUsageModel):
+        result['uptime'] = usage_model.coefficient
+        result['periods'] = [
+            [_serialize_datetime(period.begin), _serialize_datetime(period.end)] for period in usage_model.periods
+        ]
+
+    return result
+
+
+def _serialize_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
@@ -0,0 +1,77 @@
+import hashlib
+import uuid
+from typing import Dict, Iterable, Mapping, NamedTuple, Set
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.export_report import ReportType, Warning, get_export_report
+from core.scoring_config import get_scoring_config_version
+
+
+class ReportResult(NamedTuple):
+    data: ReportType
+    warnings: Set[Warning]
+
+
+def get_report_result(report_id: int) -> ReportResult:
+    """
+    Result of ExportReport, computed once per report and scoring config version.
+    Only the cache is written here, the leaderboard and rows of the report page are written by BatchScorer.
+    """
+    # the key is taken before processing, so a result computed from the outdated data is never read
+    key = _get_report_key(report_id)
+    result = cache.get(key)
+    if result is None:
+        exporter = get_export_report(report_id)
+        result = ReportResult(data=exporter.process(), warnings=exporter.warnings)
+        cache.set(key, result, settings.REPORT_CACHE_TIMEOUT)
+
+    return result
+
+
+def get_report_keys(report_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Cache keys for results of the reports, should be taken before computing the results
+    """
+    return {report_id: _get_report_key(report_id) for report_id in report_ids}
+
+
+def store_report_results(results: Mapping[str, ReportResult]) -> None:
+    """
+    Save results computed outside of `get_report_result` by keys of `get_report_keys`
+    """
+    cache.set_many(results, settings.REPORT_CACHE_TIMEOUT)
+
+
+def invalidate_reports(report_ids: Iterable[int]) -> None:
+    cache.set_many({_get_report_version_key(report_id): uuid.uuid4().hex for report_id in report_ids}, None)
+
+
+def get_reports_version(report_ids: Iterable[int]) -> str:
+    """
+    Changes when a result of any of the reports changes, good for ETag
+    """
+    keys = [_get_report_version_key(report_id) for report_id in report_ids]
+    versions = cache.get_many(keys)
+    parts = [get_scoring_config_version(), *(versions.get(key) or _get_version(key) for key in keys)]
+
+    return hashlib.sha1(':'.join(parts).encode()).hexdigest()
+
+
+def _get_report_key(report_id: int) -> str:
+    report_version = _get_version(_get_report_version_key(report_id))
+    return f'report_result:{report_id}:{report_version}:{get_scoring_config_version()}'
+
+
+def _get_report_version_key(report_id: int) -> str:
+    return f'report_version:{report_id}'
+
+
+def _get_version(key: str) -> str:
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+
+    return version
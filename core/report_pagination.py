@@ -0,0 +1,110 @@
+import json
+from datetime import date
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.db import connection
+from django.db.models import F, Q, QuerySet
+
+from extra_ep.models import Report
+
+# raid day, id
+Cursor = Tuple[Optional[date], int]
+
+
+class ReportPage(NamedTuple):
+    reports: List[Report]
+    previous_cursor: Optional[str]
+    next_cursor: Optional[str]
+
+
+def paginate_reports(
+    queryset: 'QuerySet[Report]',
+    per_page: int,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+) -> ReportPage:
+    """
+    Reports by raid day and id, the newest first, reports without a raid day on top.
+    A page is found by the cursor of a neighbour page instead of OFFSET, so any page costs
+    the same as the first one. A broken cursor gives the first page.
+    """
+    after_cursor = _parse_cursor(after)
+    before_cursor = _parse_cursor(before)
+
+    if before_cursor is not None:
+        reports = list(queryset.filter(
+            _get_before_filter(before_cursor),
+        ).order_by(
+            F('raid_day').asc(nulls_last=True), 'id',
+        )[:per_page + 1])
+        has_more = len(reports) > per_page
+        reports = reports[:per_page][::-1]
+
+        return ReportPage(
+            reports=reports,
+            previous_cursor=_format_cursor(reports[0]) if has_more else None,
+            next_cursor=_format_cursor(reports[-1]) if reports else None,
+        )
+
+    if after_cursor is not None:
+        queryset = queryset.filter(_get_after_filter(after_cursor))
+
+    reports = list(queryset.order_by(F('raid_day').desc(nulls_first=True), '-id')[:per_page + 1])
+    has_more = len(reports) > per_page
+    reports = reports[:per_page]
+
+    return ReportPage(
+        reports=reports,
+        previous_cursor=_format_cursor(reports[0]) if after_cursor is not None and reports else None,
+        next_cursor=_format_cursor(reports[-1]) if has_more else None,
+    )
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """
+    Rows estimated by the planner of PostgreSQL instead of COUNT, which reads all matching rows
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan[0]['Plan']['Plan Rows']
+
+
+def _get_after_filter(cursor: Cursor) -> Q:
+    raid_day, report_id = cursor
+    if raid_day is None:
+        return Q(raid_day__isnull=True, id__lt=report_id) | Q(raid_day__isnull=False)
+
+    # `raid_day <= day` goes first, so the index scan starts at the cursor
+    return Q(raid_day__lte=raid_day) & (Q(raid_day__lt=raid_day) | Q(id__lt=report_id))
+
+
+def _get_before_filter(cursor: Cursor) -> Q:
+    raid_day, report_id = cursor
+    if raid_day is None:
+        return Q(raid_day__isnull=True, id__gt=report_id)
+
+    return Q(raid_day__isnull=True) | Q(raid_day__gt=raid_day) | Q(raid_day=raid_day, id__gt=report_id)
+
+
+def _format_cursor(report: Report) -> str:
+    return f'{report.raid_day.isoformat() if report.raid_day else ""}_{report.id}'
+
+
+def _parse_cursor(value: Optional[str]) -> Optional[Cursor]:
+    if not value:
+        return None
+
+    raid_day, _, report_id = value.partition('_')
+    try:
+        return date.fromisoformat(raid_day) if raid_day else None, int(report_id)
+    except ValueError:
+        return None
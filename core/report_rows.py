@@ -0,0 +1,94 @@
+from typing import Any, Dict, Iterable, Iterator, List, Mapping
+
+from django.db import transaction
+
+from core.export_report import ConsumableUsageModel, ReportType, UptimeConsumableUsageModel, Warning
+from core.report_cache import ReportResult
+from core.scoring_config import get_scoring_config
+from extra_ep.models import Player, RaidRun, Report, ReportRow
+
+BATCH_SIZE = 1000
+
+
+def update_reports_rows(results: Mapping[int, ReportResult]) -> None:
+    """
+    Replace rows and warnings of the report pages by the ExportReport results, with one delete and one insert
+    """
+    raid_runs = {
+        raid_run.id: raid_run
+        for raid_run in RaidRun.objects.select_related('raid').filter(report_id__in=results.keys())
+    }
+    player_ids = {player_id for result in results.values() for player_id in result.data}
+    players = {player.id: player for player in Player.objects.select_related('klass').filter(id__in=player_ids)}
+
+    rows: List[ReportRow] = []
+    for report_id, result in results.items():
+        rows.extend(_get_report_rows(report_id, result.data, raid_runs, players))
+
+    with transaction.atomic():
+        # the same lock as in `update_reports_points`
+        report_ids = set(Report.objects.select_for_update().filter(
+            id__in=results.keys(),
+        ).order_by('id').values_list('id', flat=True))
+
+        ReportRow.objects.filter(report_id__in=report_ids).delete()
+        ReportRow.objects.bulk_create([row for row in rows if row.report_id in report_ids], batch_size=BATCH_SIZE)
+
+        for report_id in report_ids:
+            Report.objects.filter(id=report_id).update(warnings=_serialize_warnings(results[report_id].warnings))
+
+
+def _serialize_warnings(warnings: Iterable[Warning]) -> List[Dict[str, Any]]:
+    return [
+        {'text': warning.text, 'player_id': warning.player_id}
+        for warning in sorted(warnings, key=lambda warning: (warning.text, warning.player_id or 0))
+    ]
+
+
+def _get_report_rows(
+    report_id: int,
+    data: ReportType,
+    raid_runs: Dict[int, RaidRun],
+    players: Dict[int, Player],
+) -> Iterator[ReportRow]:
+    scoring_config = get_scoring_config()
+
+    for player_id, raid_run_data in data.items():
+        player = players[player_id]
+
+        for raid_run_id, usage_models in raid_run_data.items():
+            raid_run = raid_runs[raid_run_id]
+
+            for usage_model in usage_models:
+                if usage_model.points == 0:
+                    continue
+
+                row = ReportRow(
+                    report_id=report_id,
+                    raid_run_id=raid_run.id,
+                    player_id=player.id,
+                    raid_name=raid_run.raid.name,
+                    player_name=player.name,
+                    color=player.klass.color if player.klass else None,
+                    points=usage_model.points,
+                )
+
+                if isinstance(usage_model, ConsumableUsageModel):
+                    if not usage_model.times_used:
+                        continue
+                    row.amount = usage_model.times_used
+
+                if isinstance(usage_model, UptimeConsumableUsageModel):
+                    row.uptime = round(usage_model.coefficient * 100, 2)
+
+                if usage_model.consumable_id is not None and usage_model.consumable_id in scoring_config.consumables:
+                    consumable = scoring_config.consumables[usage_model.consumable_id]
+                    row.item_id = consumable.item_id
+                    row.spell_id = consumable.spell_id
+
+                if usage_model.group_id is not None and usage_model.group_id in scoring_config.groups:
+                    consumable_group = scoring_config.groups[usage_model.group_id]
+                    row.group_id = consumable_group.id
+                    row.group_name = consumable_group.name
+
+                yield row
@@ -0,0 +1,130 @@
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, DefaultDict, Dict, List, Mapping, Optional, Tuple
+
+from django.core.cache import cache
+
+from extra_ep.models import Boss, Consumable, ConsumableGroup, ConsumableUsageLimit, ConsumablesSet
+
+SCORING_CONFIG_VERSION_KEY = 'scoring_config_version'
+
+
+@dataclass(frozen=True)
+class ScoringConfig:
+    """
+    Consumables, their sets, groups and limits with bosses, loaded once per process and shared by all consumers.
+    Model instances inside are shared as well, so they should not be changed.
+    """
+    version: str
+    consumables: Mapping[int, Consumable]
+    consumables_by_spell_id: Mapping[int, Consumable]
+    consumable_sets: Mapping[int, Mapping[int, ConsumablesSet]]  # klass_id: role_id -> set
+    groups: Mapping[int, ConsumableGroup]
+    limits: Mapping[int, Mapping[int, int]]  # raid_id: consumable_id -> limit
+    bosses: Mapping[int, Boss]  # by encounter_id
+
+    def __reduce__(self) -> Tuple[Callable[..., 'ScoringConfig'], Tuple[Any, ...]]:
+        # mappingproxy could not be pickled, so the snapshot is sent to worker processes as plain containers
+        return _make_scoring_config, (
+            self.version,
+            list(self.consumables.values()),
+            {klass_id: dict(sets) for klass_id, sets in self.consumable_sets.items()},
+            list(self.groups.values()),
+            {raid_id: dict(raid_limits) for raid_id, raid_limits in self.limits.items()},
+            list(self.bosses.values()),
+        )
+
+
+_config: Optional[ScoringConfig] = None
+_lock = threading.Lock()
+
+
+def get_scoring_config() -> ScoringConfig:
+    """
+    The snapshot is loaded again only when the version is changed by `invalidate_scoring_config`
+    """
+    global _config
+
+    version = get_scoring_config_version()
+    config = _config
+    if config is not None and config.version == version:
+        return config
+
+    with _lock:
+        if _config is None or _config.version != version:
+            # the version is taken before loading, so changes made during the loading cause one more reload
+            _config = _load_scoring_config(version)
+
+        return _config
+
+
+def use_scoring_config(config: ScoringConfig) -> None:
+    """
+    Use the snapshot loaded by another process, e.g. in workers of a process pool
+    """
+    global _config
+
+    with _lock:
+        _config = config
+
+
+def get_scoring_config_version() -> str:
+    version = cache.get(SCORING_CONFIG_VERSION_KEY)
+    if version is None:
+        cache.add(SCORING_CONFIG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(SCORING_CONFIG_VERSION_KEY)
+
+    return version
+
+
+def invalidate_scoring_config() -> None:
+    """
+    Consumables, sets, groups, limits, raids or bosses changed, all reports should be scored again
+    """
+    cache.set(SCORING_CONFIG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _load_scoring_config(version: str) -> ScoringConfig:
+    consumable_sets: DefaultDict[int, Dict[int, ConsumablesSet]] = defaultdict(dict)
+    qs = ConsumablesSet.objects.prefetch_related('consumables', 'groups', 'groups__consumables').all()
+    for consumable_set in qs:
+        consumable_sets[consumable_set.klass_id][consumable_set.role_id] = consumable_set
+
+    limits: DefaultDict[int, Dict[int, int]] = defaultdict(dict)
+    for limit in ConsumableUsageLimit.objects.all():
+        limits[limit.raid_id][limit.consumable_id] = limit.limit
+
+    return _make_scoring_config(
+        version=version,
+        consumables=list(Consumable.objects.all()),
+        consumable_sets=consumable_sets,
+        groups=list(ConsumableGroup.objects.prefetch_related('consumables')),
+        limits=limits,
+        bosses=list(Boss.objects.select_related('raid')),
+    )
+
+
+def _make_scoring_config(
+    version: str,
+    consumables: List[Consumable],
+    consumable_sets: Mapping[int, Mapping[int, ConsumablesSet]],
+    groups: List[ConsumableGroup],
+    limits: Mapping[int, Mapping[int, int]],
+    bosses: List[Boss],
+) -> ScoringConfig:
+    return ScoringConfig(
+        version=version,
+        consumables=MappingProxyType({consumable.id: consumable for consumable in consumables}),
+        consumables_by_spell_id=MappingProxyType({consumable.spell_id: consumable for consumable in consumables}),
+        consumable_sets=MappingProxyType({
+            klass_id: MappingProxyType(dict(sets)) for klass_id, sets in consumable_sets.items()
+        }),
+        groups=MappingProxyType({group.id: group for group in groups}),
+        limits=MappingProxyType({
+            raid_id: MappingProxyType(dict(raid_limits)) for raid_id, raid_limits in limits.items()
+        }),
+        bosses=MappingProxyType({boss.encounter_id: boss for boss in bosses}),
+    )
@@ -0,0 +1,28 @@
+"""
+Entry points of the processes BatchScorer spawns to score reports.
+
+A spawned process imports this module to unpickle them before Django is set up, so nothing here
+touches models at the top level and the scoring code is imported only after `django.setup()`.
+"""
+import pickle
+from typing import TYPE_CHECKING, Any, Dict
+
+if TYPE_CHECKING:
+    from core.batch_scoring import ScoredReport
+
+
+def init_worker(databases: Dict[str, Dict[str, Any]], scoring_config: bytes) -> None:
+    import django
+    from django.conf import settings
+
+    # the databases of the parent process, they differ from the settings module e.g. in tests
+    settings.DATABASES = databases
+    django.setup()
+
+    from core.scoring_config import use_scoring_config
+    use_scoring_config(pickle.loads(scoring_config))
+
+
+def score_report(report_id: int) -> 'ScoredReport':
+    from core.batch_scoring import score_report
+    return score_report(report_id)
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.batch_scoring import BatchScorer, claim_reports_for_scoring
+from core.export_report import ExportReport
+from core.scoring_config import get_scoring_config_version, invalidate_scoring_config
+from extra_ep.models import (
+    Class, Consumable, ConsumablesSet, ConsumableUsage, ImportJob, Player, PlayerReportPoints, Raid, RaidRun, Report,
+    ReportRow, Role,
+)
+
+BEGIN = datetime(2020, 1, 1, 19, tzinfo=timezone.utc)
+
+
+class BatchScoringFixture:
+    def setUp(self) -> None:
+        invalidate_scoring_config()
+
+        self.user = User.objects.create(username='test')
+        self.raid = Raid.objects.create(name='Molten Core')
+        role = Role.objects.create(name='Melee')
+        klass = Class.objects.create(name='Warrior', color='C79C6E')
+        self.consumable = Consumable.objects.create(spell_id=1, points_for_usage=2, usage_based_item=True)
+        consumables_set = ConsumablesSet.objects.create(role=role, klass=klass)
+        consumables_set.consumables.set([self.consumable])
+
+        self.player = Player.objects.create(name='Player', role=role, klass=klass)
+        self.report = self._create_report()
+        self.other_report = self._create_report()
+        self._run_worker()
+
+    @staticmethod
+    def _run_worker() -> None:
+        call_command('import_worker', once=True, stdout=StringIO())
+
+    def _create_report(self) -> Report:
+        report = Report.objects.create(uploaded_by=self.user)
+        raid_run = RaidRun.objects.create(report=report, raid=self.raid, begin=BEGIN, end=BEGIN + timedelta(hours=2))
+        raid_run.players.set([self.player])
+        ConsumableUsage.objects.create(
+            raid_run=raid_run,
+            player=self.player,
+            consumable=self.consumable,
+            begin=BEGIN,
+            end=BEGIN + timedelta(minutes=1),
+        )
+        return report
+
+    def _get_points(self, report: Report) -> int:
+        return PlayerReportPoints.objects.get(report=report, player=self.player).points
+
+    def _needs_scoring(self, report: Report) -> bool:
+        return Report.objects.values_list('needs_scoring', flat=True).get(id=report.id)
+
+
+class BatchScoringTestCase(BatchScoringFixture, TestCase):
+    def test_worker_scores_marked_reports(self) -> None:
+        assert not self._needs_scoring(self.report)
+        assert self._get_points(self.report) == 2
+
+        self.consumable.points_for_usage = 3
+        # the scoring config is reloaded after commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consumable.save()
+        assert self._needs_scoring(self.report)
+        assert self._needs_scoring(self.other_report)
+
+        self._run_worker()
+        assert not self._needs_scoring(self.report)
+        assert self._get_points(self.report) == 3
+
+    def test_report_changes_mark_only_the_report(self) -> None:
+        raid_run = RaidRun.objects.get(report=self.report)
+        raid_run.is_hard_mode = True
+        raid_run.save()
+
+        assert self._needs_scoring(self.report)
+        assert not self._needs_scoring(self.other_report)
+
+    def test_player_changes_mark_only_reports_of_the_player(self) -> None:
+        player = Player.objects.create(name='Other')
+        RaidRun.objects.get(report=self.report).players.add(player)
+        self._run_worker()
+        version = get_scoring_config_version()
+
+        player.role = self.player.role
+        with self.captureOnCommitCallbacks(execute=True):
+            player.save()
+
+        assert self._needs_scoring(self.report)
+        assert not self._needs_scoring(self.other_report)
+        assert get_scoring_config_version() == version
+
+    def test_class_color_change_marks_reports_of_the_class(self) -> None:
+        klass = Class.objects.create(name='Mage', color='69CCF0')
+        with self.captureOnCommitCallbacks(execute=True):
+            ConsumablesSet.objects.create(role=self.player.role, klass=klass).consumables.set([self.consumable])
+        player = Player.objects.create(name='Mage', role=self.player.role, klass=klass)
+        raid_run = RaidRun.objects.get(report=self.report)
+        raid_run.players.add(player)
+        ConsumableUsage.objects.create(
+            raid_run=raid_run,
+            player=player,
+            consumable=self.consumable,
+            begin=BEGIN,
+            end=BEGIN + timedelta(minutes=1),
+        )
+        self._run_worker()
+        assert ReportRow.objects.get(report=self.report, player=player).color == '69CCF0'
+
+        klass.color = '3FC7EB'
+        klass.save()
+
+        assert self._needs_scoring(self.report)
+        assert not self._needs_scoring(self.other_report)
+
+        self._run_worker()
+        assert ReportRow.objects.get(report=self.report, player=player).color == '3FC7EB'
+
+    def test_reports_being_imported_are_not_claimed(self) -> None:
+        self.consumable.save()
+        ImportJob.objects.create(report=self.report, log_file='logs/test.txt', status=ImportJob.RUNNING)
+
+        assert claim_reports_for_scoring(10) == [self.other_report.id]
+        assert claim_reports_for_scoring(10) == []
+
+    def test_requests_do_not_write(self) -> None:
+        self.consumable.points_for_usage = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consumable.save()
+
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context, mock.patch.object(ExportReport, 'process') as process:
+            assert self.client.get(f'/report/{self.report.id}/').status_code == 200
+            assert self.client.get('/leaderboard/').status_code == 200
+            b''.join(self.client.get(f'/report/{self.report.id}/export.csv').streaming_content)
+
+        process.assert_not_called()
+        assert all(query['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE')) for query in context.captured_queries)
+        assert self._get_points(self.report) == 2
+
+    def test_report_page_shows_stored_warnings(self) -> None:
+        raid_run = RaidRun.objects.get(report=self.report)
+        player = Player.objects.create(name='NoRole')
+        raid_run.players.add(player)
+        self._run_worker()
+
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        with mock.patch.object(ExportReport, 'process') as process:
+            response = self.client.get(f'/report/{self.report.id}/')
+
+        process.assert_not_called()
+        assert Report.objects.get(id=self.report.id).warnings == [
+            {'text': 'У игрока NoRole не указана роль!', 'player_id': player.id},
+        ]
+        assert 'У игрока NoRole не указана роль!' in response.content.decode()
+
+
+class ParallelBatchScoringTestCase(BatchScoringFixture, TransactionTestCase):
+    def setUp(self) -> None:
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Spawned processes do not see an in-memory database')
+
+        super().setUp()
+
+    def test_processes_use_config_of_the_parent(self) -> None:
+        # changes are committed at once here, so the config is reloaded in this process only
+        self.consumable.points_for_usage = 3
+        self.consumable.save()
+        reports = [self.report, self.other_report, self._create_report(), self._create_report()]
+
+        scored_reports = list(BatchScorer(processes=2).process([report.id for report in reports]))
+
+        assert [scored_report.error for scored_report in scored_reports] == [''] * len(reports)
+        assert [self._get_points(report) for report in reports] == [3] * len(reports)
+        assert not Report.objects.filter(needs_scoring=True).exists()
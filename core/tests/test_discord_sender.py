@@ -0,0 +1,136 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from typing import Any, Dict, List
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from core.discord import DiscordNotification
+from core.discord_sender import (
+    MAX_ATTEMPTS, MAX_EMBED_CHARACTERS, MAX_EMBEDS, RETRY_DELAY, SENDING_TIMEOUT, DiscordSender, claim_messages,
+    enqueue_report,
+)
+from extra_ep.management.commands.discord_stub import StubWebhookServer
+from extra_ep.models import DiscordMessage, Report
+
+
+class DiscordSenderTestCase(TestCase):
+    def setUp(self) -> None:
+        self.server = StubWebhookServer(('127.0.0.1', 0), stdout=StringIO())
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.shutdown)
+
+        self.sender = DiscordSender(url=self.server.url, timeout=5)
+        self.addCleanup(self.sender.session.close)
+
+        self.user = User.objects.create(username='test')
+        # report id -> embed
+        self.embeds: Dict[int, Dict[str, Any]] = {}
+        patcher = mock.patch.object(DiscordNotification, 'get_embed', autospec=True, side_effect=self._get_embed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_embed(self, notification: DiscordNotification) -> Dict[str, Any]:
+        return self.embeds[notification.report.id]
+
+    def _enqueue(self, amount: int, description_length: int = 10) -> List[DiscordMessage]:
+        messages = []
+        for _ in range(amount):
+            report = Report.objects.create(uploaded_by=self.user)
+            self.embeds[report.id] = {'description': 'x' * description_length}
+            messages.append(enqueue_report(report))
+
+        return messages
+
+    def _get_embeds_per_request(self) -> List[int]:
+        return [len(payload['embeds']) for payload in self.server.payloads]
+
+    def test_rate_limit_postpones_the_round(self) -> None:
+        self.server.rate_limit_every = 1
+        self.server.retry_after = 30
+        messages = self._enqueue(MAX_EMBEDS + 2)
+
+        started_at = timezone.now()
+        assert self.sender.send_pending() == len(messages)
+
+        # the second batch is not sent, the limit is shared by the whole webhook
+        assert self._get_embeds_per_request() == [MAX_EMBEDS]
+        for message in DiscordMessage.objects.all():
+            assert message.status == DiscordMessage.QUEUED
+            assert message.attempts == 0
+            assert message.next_attempt_at >= started_at + timedelta(seconds=30)
+
+        # nothing is due until retry_after passes
+        assert self.sender.send_pending() == 0
+
+    def test_server_error_is_retried_with_growing_delay(self) -> None:
+        self.server.fail_every = 1
+        message, = self._enqueue(1)
+
+        for attempt in range(1, MAX_ATTEMPTS):
+            started_at = timezone.now()
+            assert self.sender.send_pending() == 1
+
+            message.refresh_from_db()
+            assert message.status == DiscordMessage.QUEUED
+            assert message.attempts == attempt
+            assert message.error.startswith('500: ')
+            delay = message.next_attempt_at - started_at
+            assert RETRY_DELAY * 2 ** (attempt - 1) <= delay < RETRY_DELAY * 2 ** (attempt - 1) + timedelta(seconds=5)
+
+            DiscordMessage.objects.filter(id=message.id).update(next_attempt_at=timezone.now())
+
+        assert self.sender.send_pending() == 1
+        message.refresh_from_db()
+        assert message.status == DiscordMessage.FAILED
+        assert message.attempts == MAX_ATTEMPTS
+        assert len(self.server.payloads) == MAX_ATTEMPTS
+
+    def test_client_error_fails_at_once(self) -> None:
+        message, = self._enqueue(1, description_length=MAX_EMBED_CHARACTERS + 1)
+
+        assert self.sender.send_pending() == 1
+
+        message.refresh_from_db()
+        assert message.status == DiscordMessage.FAILED
+        assert message.attempts == 1
+        assert message.error.startswith('400: ')
+        assert len(self.server.payloads) == 1
+
+    def test_batches_by_amount_of_embeds(self) -> None:
+        self._enqueue(MAX_EMBEDS + 2)
+
+        self.sender.send_pending()
+
+        assert self._get_embeds_per_request() == [MAX_EMBEDS, 2]
+        assert not DiscordMessage.objects.exclude(status=DiscordMessage.SENT).exists()
+
+    def test_batches_by_amount_of_characters(self) -> None:
+        self._enqueue(5, description_length=MAX_EMBED_CHARACTERS * 2 // 5)
+
+        self.sender.send_pending()
+
+        assert self._get_embeds_per_request() == [2, 2, 1]
+        assert not DiscordMessage.objects.exclude(status=DiscordMessage.SENT).exists()
+
+    def test_sending_messages_are_reclaimed_after_timeout(self) -> None:
+        stale, fresh = self._enqueue(2)
+        DiscordMessage.objects.update(status=DiscordMessage.SENDING)
+        DiscordMessage.objects.filter(id=stale.id).update(
+            updated_at=timezone.now() - SENDING_TIMEOUT - timedelta(minutes=1),
+        )
+
+        # the fresh one is still owned by another sender
+        assert self.sender.send_pending() == 1
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        assert stale.status == DiscordMessage.SENT
+        assert fresh.status == DiscordMessage.SENDING
+        assert claim_messages() == []
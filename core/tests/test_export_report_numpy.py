@@ -0,0 +1,116 @@
+import random
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from core.export_report import ExportReport
+from core.export_report_numpy import VectorizedExportReport
+from core.scoring_config import invalidate_scoring_config
+from extra_ep.models import (
+    Class,
+    Consumable,
+    ConsumableGroup,
+    ConsumablesSet,
+    ConsumableUsage,
+    ConsumableUsageLimit,
+    Player,
+    Raid,
+    RaidRun,
+    Report,
+    Role,
+)
+
+BEGIN = datetime(2020, 1, 1, 19, tzinfo=timezone.utc)
+SEED = 2020
+
+
+class VectorizedExportReportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        rnd = random.Random(SEED)
+
+        raid = Raid.objects.create(name='Molten Core')
+        role = Role.objects.create(name='Melee')
+        klass = Class.objects.create(name='Warrior', color='C79C6E')
+
+        flask = Consumable.objects.create(spell_id=1, points_for_usage=0, points_over_raid=10)
+        juju = Consumable.objects.create(spell_id=2, points_for_usage=0, points_over_raid=5, required=False)
+        potion = Consumable.objects.create(spell_id=3, points_for_usage=2, usage_based_item=True)
+        world_buff = Consumable.objects.create(
+            spell_id=4,
+            points_for_usage=3,
+            usage_based_item=True,
+            is_world_buff=True,
+        )
+        elixirs = [
+            Consumable.objects.create(spell_id=5, points_for_usage=1, limit_over_report=3),
+            Consumable.objects.create(spell_id=6, points_for_usage=1),
+        ]
+        ConsumableUsageLimit.objects.create(raid=raid, consumable=potion, limit=4)
+
+        group = ConsumableGroup.objects.create(name='Elixirs', points=8)
+        group.consumables.set(elixirs)
+        consumables_set = ConsumablesSet.objects.create(role=role, klass=klass)
+        consumables_set.consumables.set([flask, juju, potion, world_buff])
+        consumables_set.groups.set([group])
+
+        report = Report.objects.create(uploaded_by=User.objects.create(username='test'))
+        raid_runs = [
+            RaidRun.objects.create(report=report, raid=raid, begin=BEGIN, end=BEGIN + timedelta(hours=2)),
+            RaidRun.objects.create(
+                report=report,
+                raid=raid,
+                begin=BEGIN + timedelta(hours=3),
+                end=BEGIN + timedelta(hours=4),
+                required_uptime=0.7,
+                minimum_uptime=0.3,
+                points_coefficient=0.5,
+            ),
+            RaidRun.objects.create(
+                report=report,
+                raid=raid,
+                begin=BEGIN + timedelta(hours=5),
+                end=BEGIN + timedelta(hours=6),
+                is_hard_mode=True,
+            ),
+        ]
+
+        players = [Player.objects.create(name=f'Player{i}', role=role, klass=klass) for i in range(6)]
+        # without a role, a class or a set, warnings are the same as well
+        players.append(Player.objects.create(name='NoRole', klass=klass))
+        players.append(Player.objects.create(name='NoSet', role=Role.objects.create(name='Healer'), klass=klass))
+
+        usages = []
+        for raid_run in raid_runs:
+            raid_run.players.set(players)
+            for player in players:
+                for consumable in [flask, juju, potion, world_buff, *elixirs]:
+                    for _ in range(rnd.randint(0, 6)):
+                        # usages before and after raid runs are counted as well
+                        begin = raid_run.begin + timedelta(seconds=rnd.randint(-3600, 4 * 3600))
+                        usages.append(ConsumableUsage(
+                            raid_run=raid_run,
+                            player=player,
+                            consumable=consumable,
+                            begin=begin,
+                            end=begin + timedelta(seconds=rnd.choice([0, 1, 600, 1800, 3600])),
+                        ))
+
+        ConsumableUsage.objects.bulk_create(usages)
+        cls.report = report
+
+    def setUp(self) -> None:
+        invalidate_scoring_config()
+
+    def test_same_result(self) -> None:
+        export_report = ExportReport(report_id=self.report.id)
+        vectorized_export_report = VectorizedExportReport(report_id=self.report.id)
+
+        result = export_report.process()
+        vectorized_result = vectorized_export_report.process()
+
+        assert result
+        assert vectorized_result == result
+        assert vectorized_export_report.warnings == export_report.warnings
@@ -0,0 +1,137 @@
+import os
+import random
+import tempfile
+from typing import Any, List, Tuple
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.combat_log import LOG_END, PLAYERS_SEEN, split_log
+from core.import_report import ParallelReportImporter, ReportImporter
+from core.scoring_config import invalidate_scoring_config
+from extra_ep.models import Boss, Consumable, ConsumableUsage, Raid, RaidRun, Report
+
+SEED = 2020
+NAMES = ['Граф', 'Аитера', 'Охик', 'Арахис', 'Туморроу', 'Лизон']
+# (encounter id, raid end)
+ENCOUNTERS = [(663, False), (664, False), (672, True), (610, False), (617, True)]
+FLASK, ELIXIR, POTION, WORLD_BUFF = 17628, 11405, 17531, 22888
+
+
+def make_log(rnd: random.Random, amount: int) -> str:
+    """
+    Log of `amount` random rows with encounters, consumables and noise of untracked events
+    """
+    rows = ['10/10 18:00:00.000  COMBAT_LOG_VERSION,9,ADVANCED_LOG_ENABLED,1']
+    encounters = iter(ENCOUNTERS * amount)
+    for i in range(amount):
+        seconds = i * 5
+        time = f'10/10 {18 + seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{rnd.randint(0, 999):03d}'
+        guid = f'Player-4452-{rnd.randrange(len(NAMES)):08X}'
+        player = f'"{NAMES[int(guid[-8:], 16)]}-Пламегор",0x511,0x0'
+        spell_id = rnd.choice([FLASK, ELIXIR, POTION, 12345])
+
+        if i % (amount // 10) == 0:
+            encounter_id, _ = next(encounters)
+            rows.append(f'{time}  ENCOUNTER_START,{encounter_id},"Boss, The Great",9,40,409')
+            rows.append(f'{time}  ENCOUNTER_END,{encounter_id},"Boss, The Great",9,40,1')
+            continue
+
+        event = rnd.choice(['SPELL_DAMAGE', 'SPELL_AURA_APPLIED', 'SPELL_CAST_SUCCESS', 'SPELL_AURA_REMOVED', 'INFO'])
+        if event == 'SPELL_DAMAGE':
+            rows.append(f'{time}  SPELL_DAMAGE,{guid},{player},Creature-0-1,"Core Hound, Elite",0xa48,0x0,11366')
+        elif event == 'INFO':
+            rows.append(f'{time}  COMBATANT_INFO,{guid},1,2,(1,2,3),[(1,2,3)],[Player-4452-1,{WORLD_BUFF}]')
+        else:
+            rows.append(f'{time}  {event},{guid},{player},{guid},{player},{spell_id},"Elixir, Mighty",0x1,BUFF')
+
+    return '\n'.join(rows) + '\n'
+
+
+class ReportImporterTestCase(TestCase):
+    def setUp(self) -> None:
+        invalidate_scoring_config()
+
+        raid = Raid.objects.create(name='Molten Core')
+        for encounter_id, raid_end in ENCOUNTERS:
+            Boss.objects.create(name=str(encounter_id), encounter_id=encounter_id, raid=raid, raid_end=raid_end)
+
+        Consumable.objects.create(spell_id=FLASK, points_for_usage=0, points_over_raid=10, duration=120)
+        Consumable.objects.create(spell_id=ELIXIR, points_for_usage=1, duration=60, check_by_aura_apply=True)
+        Consumable.objects.create(spell_id=POTION, points_for_usage=1, usage_based_item=True)
+        Consumable.objects.create(spell_id=WORLD_BUFF, points_for_usage=3, is_world_buff=True)
+
+        self.user = User.objects.create(username='test')
+
+        log_file, self.log_path = tempfile.mkstemp(suffix='.txt')
+        self.addCleanup(os.remove, self.log_path)
+        with os.fdopen(log_file, 'w', encoding='utf-8') as log:
+            log.write(make_log(random.Random(SEED), 2000))
+
+    def _import(self, report: Report) -> None:
+        with open(self.log_path, encoding='utf-8') as log_file:
+            ReportImporter(report_id=report.id, log_file=log_file).process()
+
+    @staticmethod
+    def _get_report_data(report: Report) -> Tuple[List[Tuple[Any, ...]], List[Tuple[Any, ...]]]:
+        raid_runs = RaidRun.objects.filter(report=report).order_by('begin', 'id')
+        usages = ConsumableUsage.objects.filter(raid_run__report=report).order_by(
+            'raid_run__begin', 'player__name', 'consumable_id', 'begin', 'end',
+        )
+        return (
+            [(raid_run.raid_id, raid_run.begin, raid_run.end, raid_run.players.count()) for raid_run in raid_runs],
+            list(usages.values_list('raid_run__begin', 'player__name', 'consumable_id', 'begin', 'end')),
+        )
+
+    def test_segments_give_events_of_the_whole_log(self) -> None:
+        reader = ReportImporter(report_id=0, log_file=None)._reader
+        with open(self.log_path, encoding='utf-8') as log_file:
+            events = list(reader.read(log_file))
+
+        for parts in (1, 2, 7, 50):
+            segment_events = []
+            for start, end in split_log(self.log_path, parts):
+                segment_events.extend(reader.read_segment(self.log_path, start, end, 'utf-8'))
+
+            # every segment ends with LOG_END, PLAYERS_SEEN are split by segments
+            assert [event for event in segment_events if event.event not in (LOG_END, PLAYERS_SEEN)] == [
+                event for event in events if event.event not in (LOG_END, PLAYERS_SEEN)
+            ]
+            assert segment_events[-1] == events[-1]
+
+    def test_parallel_import_is_the_same(self) -> None:
+        report = Report.objects.create(uploaded_by=self.user)
+        self._import(report)
+
+        parallel_report = Report.objects.create(uploaded_by=self.user)
+        ParallelReportImporter(
+            report_id=parallel_report.id,
+            log_path=self.log_path,
+            encoding='utf-8',
+            processes=2,
+        ).process()
+
+        assert self._get_report_data(parallel_report) == self._get_report_data(report)
+
+    def test_import_again_replaces_raid_runs(self) -> None:
+        report = Report.objects.create(uploaded_by=self.user)
+        self._import(report)
+        raid_runs, usages = self._get_report_data(report)
+        assert raid_runs
+        assert usages
+
+        # a job taken again after RUNNING_TIMEOUT
+        self._import(report)
+
+        assert self._get_report_data(report) == (raid_runs, usages)
+
+    def test_truncated_last_row(self) -> None:
+        # the raid is not over when the log ends
+        with open(self.log_path, 'a', encoding='utf-8') as log_file:
+            log_file.write('10/10 21:00:00.000  ENCOUNTER_START,663,"Boss, The Great",9,40,409\n10/10 21:0')
+
+        report = Report.objects.create(uploaded_by=self.user)
+        self._import(report)
+
+        last_raid_run = RaidRun.objects.filter(report=report).latest('begin')
+        assert last_raid_run.begin == last_raid_run.end
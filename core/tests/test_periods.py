@@ -0,0 +1,166 @@
+import random
+from datetime import datetime, timedelta
+from typing import List, Set
+
+from django.test import SimpleTestCase
+
+from core.export_report import ExportReport
+from core.periods import Period, clip_periods, union_periods
+from extra_ep.models import RaidRun
+
+BASE = datetime(2020, 1, 1, 20)
+SEED = 2020
+CASES = 500
+
+
+def _insert_into_uptime_list(period: Period, uptime_list: List[Period]) -> None:
+    """
+    The union used by ExportReport before `union_periods`, kept as is to compare the results
+    """
+    for i, existing_period in enumerate(uptime_list.copy()):
+        if period.begin <= existing_period.end and existing_period.begin <= period.end:
+            uptime_list.pop(i)
+            joined_period = Period(min(period.begin, existing_period.begin), max(period.end, existing_period.end))
+            _insert_into_uptime_list(joined_period, uptime_list)
+            return
+
+        if period.end < existing_period.begin:
+            uptime_list.insert(i - 1, period)
+            return
+
+    uptime_list.insert(len(uptime_list), period)
+
+
+def _old_union(periods: List[Period]) -> List[Period]:
+    uptime_list: List[Period] = []
+    for period in periods:
+        _insert_into_uptime_list(period, uptime_list)
+
+    return uptime_list
+
+
+def _old_raid_uptime(uptime: List[Period], begin: datetime, end: datetime) -> List[Period]:
+    """
+    `_get_raid_uptime` of ExportReport before `clip_periods`
+    """
+    return [
+        Period(max(begin, period.begin), min(end, period.end))
+        for period in uptime
+        if not (period.end < begin or period.begin > end)
+    ]
+
+
+def _minutes(begin: int, end: int) -> Period:
+    return Period(BASE + timedelta(minutes=begin), BASE + timedelta(minutes=end))
+
+
+def _covered_minutes(periods: List[Period]) -> Set[int]:
+    """
+    Brute-force coverage: every minute [t, t + 1) inside of any period
+    """
+    result: Set[int] = set()
+    for begin, end in periods:
+        first = int((begin - BASE) / timedelta(minutes=1))
+        last = int((end - BASE) / timedelta(minutes=1))
+        result.update(range(first, last))
+
+    return result
+
+
+def _total_minutes(periods: List[Period]) -> int:
+    return sum(int((end - begin) / timedelta(minutes=1)) for begin, end in periods)
+
+
+class PeriodsTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.random = random.Random(SEED)
+
+    def _get_periods(self) -> List[Period]:
+        periods: List[Period] = []
+        for _ in range(self.random.randint(0, 30)):
+            begin = self.random.randint(0, 300)
+            periods.append(_minutes(begin, begin + self.random.randint(0, 60)))
+
+        return periods
+
+    def test_union_is_sorted_and_disjoint(self) -> None:
+        for _ in range(CASES):
+            result = union_periods(self._get_periods())
+
+            for period in result:
+                assert period.begin <= period.end
+            for previous, period in zip(result, result[1:]):
+                # touching periods are joined as well
+                assert previous.end < period.begin
+
+    def test_union_matches_brute_force(self) -> None:
+        for _ in range(CASES):
+            periods = self._get_periods()
+            result = union_periods(periods)
+
+            assert _covered_minutes(result) == _covered_minutes(periods)
+            assert _total_minutes(result) == len(_covered_minutes(periods))
+
+    def test_union_matches_old_union(self) -> None:
+        for _ in range(CASES):
+            periods = self._get_periods()
+            result = union_periods(periods)
+            old_result = _old_union(periods)
+
+            # the old union covers the same time, but could keep overlapping periods
+            assert union_periods(old_result) == result
+            assert _total_minutes(result) <= _total_minutes(old_result)
+
+    def test_union_matches_old_union_of_sorted_periods(self) -> None:
+        # in the order of the log the old union never put periods in a wrong place
+        for _ in range(CASES):
+            periods = sorted(self._get_periods())
+
+            assert union_periods(periods) == _old_union(periods)
+
+    def test_clip_matches_brute_force(self) -> None:
+        for _ in range(CASES):
+            periods = union_periods(self._get_periods())
+            begin = self.random.randint(0, 300)
+            end = begin + self.random.randint(0, 120)
+            raid_run = _minutes(begin, end)
+            result = clip_periods(periods, *raid_run)
+
+            for period in result:
+                assert raid_run.begin <= period.begin <= period.end <= raid_run.end
+            assert _covered_minutes(result) == _covered_minutes(periods) & set(range(begin, end))
+
+    def test_clip_matches_old_raid_uptime(self) -> None:
+        for _ in range(CASES):
+            periods = union_periods(self._get_periods())
+            begin = self.random.randint(0, 300)
+            raid_run = _minutes(begin, begin + self.random.randint(0, 120))
+
+            assert clip_periods(periods, *raid_run) == _old_raid_uptime(periods, *raid_run)
+
+    def test_group_uptime_is_not_counted_twice(self) -> None:
+        """
+        Usages of two consumables of a group in the order ExportReport reads them. The old union put
+        periods at `i - 1`, so the last usages were not joined and the coefficient was above 1.
+        """
+        raid_run = RaidRun(begin=BASE, end=BASE + timedelta(minutes=100))
+        periods = [
+            _minutes(60, 100), _minutes(30, 56), _minutes(0, 28),
+            _minutes(0, 28), _minutes(0, 12),
+        ]
+
+        _, old_coefficient = ExportReport._get_consumable_points(
+            raid_run=raid_run,
+            raid_uptime=_old_raid_uptime(_old_union(periods), raid_run.begin, raid_run.end),
+            points=10,
+            required=True,
+        )
+        _, coefficient = ExportReport._get_consumable_points(
+            raid_run=raid_run,
+            raid_uptime=ExportReport._get_raid_uptime(union_periods(periods), raid_run),
+            points=10,
+            required=True,
+        )
+
+        assert round(old_coefficient, 2) == 1.34
+        assert round(coefficient, 2) == 0.94
@@ -1,10 +1,61 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional, Tuple
 
 import pytz
 
+TIMEZONE = pytz.timezone('Europe/Berlin')
+
 
 def parse_datetime_str(datetime_str: str) -> datetime:
     # example = 12/30 21:19:14.526
     year = datetime.today().year
     datetime_str = f'{year}/{datetime_str}000'  # add zeros for microseconds
-    return datetime.strptime(datetime_str, '%Y/%m/%d %H:%M:%S.%f').replace(tzinfo=pytz.timezone('Europe/Berlin'))
+    return datetime.strptime(datetime_str, '%Y/%m/%d %H:%M:%S.%f').replace(tzinfo=TIMEZONE)
+
+
+class CombatLogTimeParser:
+    """
+    Fast parser for combat log timestamps like `12/30 21:19:14.526`.
+
+    There is no year in the log, so it is inferred from the first timestamp (a December log uploaded
+    in January belongs to the previous year) and incremented when the log goes over the New Year.
+    One instance should be used per log.
+    """
+
+    def __init__(self, today: Optional[date] = None) -> None:
+        self._today = today or date.today()
+        self._year: Optional[int] = None
+        self._month: Optional[int] = None
+        self._date_str: Optional[str] = None
+        self._date: Tuple[int, int, int] = (0, 0, 0)
+
+    def __call__(self, datetime_str: str) -> datetime:
+        date_str, _, time_str = datetime_str.partition(' ')
+        if date_str != self._date_str:
+            self._set_date(date_str)
+
+        year, month, day = self._date
+        # time_str example = 21:19:14.526, hours are not always zero-padded
+        return datetime(
+            year,
+            month,
+            day,
+            int(time_str[:-10]),
+            int(time_str[-9:-7]),
+            int(time_str[-6:-4]),
+            int(time_str[-3:]) * 1000,
+            tzinfo=TIMEZONE,
+        )
+
+    def _set_date(self, date_str: str) -> None:
+        month_str, day_str = date_str.split('/')
+        month = int(month_str)
+
+        if self._year is None:
+            self._year = self._today.year if month <= self._today.month else self._today.year - 1
+        elif self._month is not None and month < self._month:
+            self._year += 1
+
+        self._month = month
+        self._date_str = date_str
+        self._date = (self._year, month, int(day_str))
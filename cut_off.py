@@ -1,8 +1,18 @@
 """
 Script for cut of unimportant pats of logs to upload on the website
+
+Usage: python cut_off.py <path to WoWCombatLog.txt> [--gzip] [--processes N] [--manifest URL or path]
 """
 
+import argparse
+import gzip
+import json
+import os
+import shutil
 import sys
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from typing import FrozenSet, List, Optional, Set, Tuple
 
 
 LOOK_FOR = (
@@ -16,26 +26,186 @@ LOOK_FOR = (
 
     'SPELL_CAST_SUCCESS',  # TODO remove with the old version
 )
-path = sys.argv[1]
+# event name is followed by a comma, so SPELL_AURA_APPLIED does not match SPELL_AURA_APPLIED_DOSE
+PREFIXES = tuple(f'{event},'.encode() for event in LOOK_FOR)
 
-if path[-1] == '"':
-    new_path = path[:-1] + '_processed.log"'
-else:
-    new_path = path + '_processed.log'
+# events with a spell id, filtered by the manifest
+SPELL_EVENTS = {b'SPELL_AURA_APPLIED', b'SPELL_CAST_START', b'SPELL_AURA_REMOVED', b'SPELL_CAST_SUCCESS'}
+# the website takes raid members from these events, whatever the spell is
+PLAYER_EVENTS = {b'SPELL_AURA_APPLIED', b'SPELL_CAST_SUCCESS'}
+ENCOUNTER_EVENTS = {b'ENCOUNTER_START', b'ENCOUNTER_END'}
+
+
+def split_fields(line: bytes, start: int, amount: int) -> List[bytes]:
+    """
+    Split first `amount` fields beginning from `start`, commas inside of quoted names are not separators.
+    """
+    fields: List[bytes] = []
+    position = start
+    while len(fields) < amount:
+        if line.startswith(b'"', position):
+            field_end = line.find(b',', line.find(b'"', position + 1))
+        else:
+            field_end = line.find(b',', position)
+
+        if field_end == -1:
+            fields.append(line[position:].rstrip())
+            break
+
+        fields.append(line[position:field_end])
+        position = field_end + 1
+
+    return fields
+
+
+class RowFilter:
+    def __init__(self, tracked_spell_ids: Optional[FrozenSet[bytes]] = None) -> None:
+        self.tracked_spell_ids = tracked_spell_ids
+        # players who already have a row since the last encounter event
+        self._players_seen: Set[bytes] = set()
+
+    def is_needed(self, line: bytes) -> bool:
+        # example = 12/30 21:19:14.526  SPELL_AURA_APPLIED,Player-4452-01,"Name-Server",...
+        separator = line.find(b'  ')
+        if separator == -1 or not line.startswith(PREFIXES, separator + 2):
+            return False
+
+        if self.tracked_spell_ids is None:
+            return True
+
+        event_end = line.find(b',', separator + 2)
+        event = line[separator + 2:event_end]
+        if event in ENCOUNTER_EVENTS:
+            self._players_seen = set()
+            return True
+
+        if event not in SPELL_EVENTS:
+            return True
+
+        fields = split_fields(line, event_end + 1, 9)
+        if len(fields) < 9 or fields[8] in self.tracked_spell_ids:
+            return True
+
+        # one row of each player between encounters is enough to put him into the raid
+        player_guid = fields[0]
+        if event in PLAYER_EVENTS and player_guid.startswith(b'Player-') and player_guid not in self._players_seen:
+            self._players_seen.add(player_guid)
+            return True
+
+        return False
+
+
+def load_manifest(source: str) -> FrozenSet[bytes]:
+    """
+    Load tracked spell ids published by the website at /tracked_spells.json, from the URL or a saved file
+    """
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source) as response:
+            manifest = json.load(response)
+    else:
+        with open(source, encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+
+    return frozenset(str(spell_id).encode() for spell_id in manifest['spell_ids'])
 
-first_row = True    
-
-lines = []
-with open(path, 'r', encoding='utf-8') as from_file, open(new_path, 'w', encoding='utf-8') as to_file:
-    for line in from_file.readlines():
-        if first_row:
-            first_row = False
-            lines.append(line)
-            continue
- 
-        for substring in LOOK_FOR:
-            if substring in line:
-                lines.append(line)
+
+def split_file(path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split the file into byte ranges of about the same size, every range begins at a row start.
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as from_file:
+        for part in range(1, parts):
+            from_file.seek(size * part // parts)
+            from_file.readline()
+            offset = from_file.tell()
+            if offsets[-1] < offset < size:
+                offsets.append(offset)
+
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def cut_off_range(
+    path: str,
+    start: int,
+    end: int,
+    new_path: str,
+    compress: bool,
+    tracked_spell_ids: Optional[FrozenSet[bytes]],
+) -> None:
+    row_filter = RowFilter(tracked_spell_ids)
+    size = os.path.getsize(path)
+    open_new_file = gzip.open if compress else open
+    with open(path, 'rb') as from_file, open_new_file(new_path, 'wb') as to_file:
+        from_file.seek(start)
+        position = start
+        while position < end:
+            line = from_file.readline()
+            if not line:
                 break
-                
-    to_file.writelines(lines)
+
+            next_position = position + len(line)
+            # the first and the last rows are always kept, the website takes the log time range from them
+            if position == 0 or next_position == size or row_filter.is_needed(line):
+                to_file.write(line)
+
+            position = next_position
+
+
+def cut_off(
+    path: str,
+    new_path: str,
+    compress: bool,
+    processes: int,
+    tracked_spell_ids: Optional[FrozenSet[bytes]] = None,
+) -> None:
+    ranges = split_file(path, processes)
+    if len(ranges) == 1:
+        cut_off_range(path, 0, ranges[0][1], new_path, compress, tracked_spell_ids)
+        return
+
+    # every range is written to its own file, gzip files could be joined just as plain ones
+    part_paths = [f'{new_path}.part{i}' for i in range(len(ranges))]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(cut_off_range, path, start, end, part_path, compress, tracked_spell_ids)
+            for (start, end), part_path in zip(ranges, part_paths)
+        ]
+        for future in futures:
+            future.result()
+
+    with open(new_path, 'wb') as to_file:
+        for part_path in part_paths:
+            with open(part_path, 'rb') as part_file:
+                shutil.copyfileobj(part_file, to_file)
+            os.remove(part_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Cut off rows the website does not need from the combat log')
+    parser.add_argument('path')
+    parser.add_argument('--gzip', action='store_true', help='Write gzip compressed log, the website accepts it')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        '--manifest',
+        help='URL of /tracked_spells.json of the website or a saved copy, rows of other spells are dropped',
+    )
+    args = parser.parse_args()
+
+    path = args.path
+    if path[-1] == '"':
+        path = path[:-1]
+
+    new_path = path + '_processed.log'
+    if args.gzip:
+        new_path += '.gz'
+
+    tracked_spell_ids = load_manifest(args.manifest) if args.manifest else None
+    cut_off(path, new_path, args.gzip, args.processes, tracked_spell_ids)
+    sys.stdout.write(f'{new_path}\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ from django.http import HttpResponseRedirect
 
 from extra_ep.models import (
     Boss, Class,  Consumable, ConsumableGroup, ConsumableUsage, ConsumableUsageLimit, ConsumablesSet,
-    Player, Raid, RaidRun, Report, Role
+    DiscordMessage, ImportJob, Player, Raid, RaidRun, Report, Role
 )
 
 
@@ -18,8 +18,9 @@ class ReportAdmin(admin.ModelAdmin):
     inlines = [
         RaidRunInline,
     ]
-    list_filter = ('static', 'flushed')
+    list_filter = ('static', 'flushed', 'needs_scoring')
     search_fields = ('raid_name',)
+    readonly_fields = ('scored_at',)
 
 
 @admin.register(Boss)
@@ -98,3 +99,17 @@ class RaidRunAdmin(admin.ModelAdmin):
 class ConsumableUsageAdmin(admin.ModelAdmin):
     search_fields = ('raid_run__report__raid_name', 'consumable__name', 'player__name')
     list_filter = ('raid_run__report', 'consumable', 'player')
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('report', 'status', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('started_at', 'finished_at', 'error')
+
+
+@admin.register(DiscordMessage)
+class DiscordMessageAdmin(admin.ModelAdmin):
+    list_display = ('report', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('attempts', 'sent_at', 'error')
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class ExtraEpConfig(AppConfig):
+    name = 'extra_ep'
+
+    def ready(self) -> None:
+        import extra_ep.signals  # noqa: F401
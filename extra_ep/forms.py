@@ -4,7 +4,7 @@ from extra_ep.models import Report
 
 
 class UploadFile(forms.ModelForm):
-    log_file = forms.FileField()
+    log_file = forms.FileField(help_text='Лог можно загрузить сжатым: zip, gz, bz2, xz')
 
     class Meta:
         model = Report
@@ -31,3 +31,53 @@ class ChangeExportedForm(forms.ModelForm):
             return not self.instance.flushed
 
         return super().get_initial_for_field(field, field_name)
+
+
+class ExportReportsForm(forms.Form):
+    date_from = forms.DateField(label='С', widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(label='По', widget=forms.DateInput(attrs={'type': 'date'}))
+    static = forms.TypedChoiceField(
+        label='Статик',
+        choices=[('', 'Все')] + list(Report._meta.get_field('static').choices),
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+
+
+class LeaderboardForm(forms.Form):
+    static = forms.TypedChoiceField(
+        label='Статик',
+        choices=[('', 'Все')] + list(Report._meta.get_field('static').choices),
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+    date_from = forms.DateField(label='С', required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(label='По', required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    flushed = forms.NullBooleanField(
+        label='Очки начислены',
+        required=False,
+        widget=forms.Select(choices=[('', 'Все'), ('true', 'Да'), ('false', 'Нет')]),
+    )
+
+
+class ReportsApiForm(LeaderboardForm):
+    """
+    Filters of the report list in the API, the same as of the leaderboard
+    """
+
+
+class ReportListForm(forms.Form):
+    static = forms.TypedChoiceField(
+        label='Статик',
+        choices=[('', 'Все')] + list(Report._meta.get_field('static').choices),
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+    flushed = forms.NullBooleanField(
+        label='Очки начислены',
+        required=False,
+        widget=forms.Select(choices=[('', 'Все'), ('true', 'Да'), ('false', 'Нет')]),
+    )
@@ -0,0 +1,43 @@
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Any
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.import_report import ParallelReportImporter, ReportImporter
+from extra_ep.models import Report
+
+
+class Command(BaseCommand):
+    help = 'Import a raw combat log and print import speed. Nothing is stored in the database'
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument('log_path')
+        parser.add_argument('--processes', type=int, default=1)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with open(options['log_path'], encoding='utf-8') as log_file:
+            lines = sum(1 for _ in log_file)
+
+        with transaction.atomic():
+            user, _ = User.objects.get_or_create(username='benchmark')
+            report = Report.objects.create(uploaded_by=user)
+
+            started_at = perf_counter()
+            if options['processes'] > 1:
+                ParallelReportImporter(
+                    report_id=report.id,
+                    log_path=options['log_path'],
+                    encoding='utf-8',
+                    processes=options['processes'],
+                ).process()
+            else:
+                with open(options['log_path'], encoding='utf-8') as log_file:
+                    ReportImporter(report_id=report.id, log_file=log_file).process()
+            duration = perf_counter() - started_at
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{lines} lines in {duration:.2f}s ({lines / duration:.0f} lines/s)')
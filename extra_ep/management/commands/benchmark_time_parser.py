@@ -0,0 +1,45 @@
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, Callable, List
+
+from django.core.management.base import BaseCommand
+
+from core.utils import CombatLogTimeParser, parse_datetime_str
+
+
+class Command(BaseCommand):
+    help = 'Compare combat log timestamp parsers'
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument('--lines', type=int, default=1_000_000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        timestamps = self._make_timestamps(options['lines'])
+
+        old = self._measure(parse_datetime_str, timestamps)
+        new = self._measure(CombatLogTimeParser(), timestamps)
+
+        self.stdout.write(f'parse_datetime_str: {old:.2f}s ({len(timestamps) / old:.0f} lines/s)')
+        self.stdout.write(f'CombatLogTimeParser: {new:.2f}s ({len(timestamps) / new:.0f} lines/s)')
+        self.stdout.write(f'speedup: x{old / new:.1f}')
+
+    @staticmethod
+    def _make_timestamps(amount: int) -> List[str]:
+        # four hours of a raid with the same density of events all the time
+        begin = datetime.now().replace(hour=19, minute=0)
+        step = timedelta(hours=4) / amount
+        result = []
+        for i in range(amount):
+            time = begin + step * i
+            result.append(f'{time.month}/{time.day} {time:%H:%M:%S}.{time.microsecond // 1000:03d}')
+
+        return result
+
+    @staticmethod
+    def _measure(parse: Callable[[str], datetime], timestamps: List[str]) -> float:
+        started_at = perf_counter()
+        for timestamp in timestamps:
+            parse(timestamp)
+
+        return perf_counter() - started_at
@@ -0,0 +1,44 @@
+import random
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, List
+
+from django.core.management.base import BaseCommand
+
+from core.periods import Period, clip_periods, union_periods
+
+
+class Command(BaseCommand):
+    help = 'Measure uptime calculation on a lot of consumable usages'
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument('--periods', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        periods = self._make_periods(options['periods'])
+        begin = periods[0].begin
+        raid_runs = [(begin + timedelta(hours=hour), begin + timedelta(hours=hour + 1)) for hour in range(4)]
+
+        started_at = perf_counter()
+        for _ in range(options['repeat']):
+            uptime = union_periods(periods)
+            for raid_begin, raid_end in raid_runs:
+                clip_periods(uptime, raid_begin, raid_end)
+
+        elapsed = (perf_counter() - started_at) / options['repeat']
+        self.stdout.write(f'{len(periods)} periods joined into {len(uptime)}: {elapsed * 1000:.1f}ms')
+
+    @staticmethod
+    def _make_periods(amount: int) -> List[Period]:
+        # short buffs reapplied all the time during four hours of a raid, in random order like in a group
+        begin = datetime.now().replace(hour=19, minute=0)
+        step = timedelta(hours=4) / amount
+        periods = []
+        for i in range(amount):
+            period_begin = begin + step * i
+            periods.append(Period(period_begin, period_begin + step * random.uniform(0.5, 3)))
+
+        random.shuffle(periods)
+        return periods
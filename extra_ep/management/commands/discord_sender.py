@@ -0,0 +1,34 @@
+import time
+from argparse import ArgumentParser
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from core.discord_sender import DiscordSender
+from extra_ep.models import DiscordMessage
+
+
+class Command(BaseCommand):
+    help = 'Send queued reports to the Discord webhook'
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty, postponed messages are waited for',
+        )
+        parser.add_argument('--sleep', type=float, default=2, help='Seconds to wait when there is nothing to send')
+        parser.add_argument('--url', default='', help='Webhook URL, DISCORD_WEBHOOK_URL by default')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        sender = DiscordSender(url=options['url'])
+        while True:
+            processed = sender.send_pending()
+            if processed:
+                self.stdout.write(f'Processed {processed} messages')
+                continue
+
+            if options['once'] and not DiscordMessage.objects.filter(status=DiscordMessage.QUEUED).exists():
+                return
+
+            time.sleep(options['sleep'])
@@ -0,0 +1,122 @@
+import json
+import threading
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, TextIO, Tuple
+
+from django.core.management.base import BaseCommand
+
+from core.discord_sender import MAX_EMBED_CHARACTERS, MAX_EMBEDS, get_embed_length
+
+
+class StubWebhookServer(ThreadingHTTPServer):
+    """
+    Answers as the Discord webhook does: checks limits of a message and answers with 429 or 500 when asked to.
+    Payloads of all requests are kept in `payloads`.
+    """
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        stdout: TextIO,
+        rate_limit_every: int = 0,
+        retry_after: float = 1,
+        fail_every: int = 0,
+    ) -> None:
+        super().__init__(address, WebhookHandler)
+        self.host = address[0]
+        self.stdout = stdout
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.fail_every = fail_every
+        self.payloads: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        # the port is chosen by the system when 0 is passed
+        return f'http://{self.host}:{self.server_port}/webhook'
+
+    def add_payload(self, payload: Dict[str, Any]) -> int:
+        """
+        Returns the number of the request
+        """
+        with self._lock:
+            self.payloads.append(payload)
+            return len(self.payloads)
+
+    def get_answer(self, number: int, embeds: List[Dict[str, Any]], length: int) -> Tuple[int, Any]:
+        if self.rate_limit_every and number % self.rate_limit_every == 0:
+            return 429, {'message': 'You are being rate limited.', 'retry_after': self.retry_after}
+
+        if self.fail_every and number % self.fail_every == 0:
+            return 500, {'message': 'Internal Server Error'}
+
+        if not embeds or len(embeds) > MAX_EMBEDS or length > MAX_EMBED_CHARACTERS:
+            return 400, {'message': 'Invalid Form Body'}
+
+        return 204, None
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    # keeps the connection open, so reuse of connections by the sender could be seen in the output
+    protocol_version = 'HTTP/1.1'
+    server: StubWebhookServer
+
+    def do_POST(self) -> None:  # noqa: N802
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        number = self.server.add_payload(payload)
+
+        embeds = payload.get('embeds') or []
+        length = sum(get_embed_length(embed) for embed in embeds)
+        self.server.stdout.write(
+            f'#{number} from port {self.client_address[1]}: {len(embeds)} embeds, {length} characters\n',
+        )
+
+        status, body = self.server.get_answer(number, embeds, length)
+        if status == 204:
+            for embed in embeds:
+                self.server.stdout.write(f'    {embed.get("title")}\n')
+
+        self._answer(status, body)
+
+    def _answer(self, status: int, body: Any = None) -> None:
+        content = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(content)))
+        if content:
+            self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Local stand-in for the Discord webhook to try discord_sender without posting to a real channel. '
+        'Checks limits of a message and answers with 429 or 500 when asked to'
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--rate-limit-every', type=int, default=0, help='Answer every N-th request with 429')
+        parser.add_argument('--retry-after', type=float, default=1, help='Seconds of retry_after for 429')
+        parser.add_argument('--fail-every', type=int, default=0, help='Answer every N-th request with 500')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        server = StubWebhookServer(
+            ('127.0.0.1', options['port']),
+            stdout=self.stdout,
+            rate_limit_every=options['rate_limit_every'],
+            retry_after=options['retry_after'],
+            fail_every=options['fail_every'],
+        )
+        self.stdout.write(f'Webhook URL: {server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,124 @@
+from argparse import ArgumentParser
+from datetime import date, datetime, timedelta
+from typing import Any, Dict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, QuerySet
+from django.utils import timezone
+
+from core.export_report import ExportReport
+from core.leaderboard import get_standings
+from extra_ep.models import Consumable, ConsumableUsage, Player, Raid, RaidRun, Report, ReportRow
+
+# tables analyzed after seeding, so the planner knows their size
+SEEDED_TABLES = (Report, RaidRun, Player, Consumable, ConsumableUsage)
+
+
+class Command(BaseCommand):
+    help = (
+        'Show query plans of the hot queries over consumable usages, reports and the leaderboard. '
+        'Runs EXPLAIN ANALYZE on PostgreSQL and EXPLAIN on other databases'
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            '--seed-reports',
+            type=int,
+            default=0,
+            help='Add that many generated reports before explaining, they are rolled back at the end',
+        )
+        parser.add_argument('--players', type=int, default=25, help='Players of every generated raid run')
+        parser.add_argument('--consumables', type=int, default=10)
+        parser.add_argument('--usages', type=int, default=20, help='Usages of every consumable by a player')
+        parser.add_argument('--report-id', type=int, help='The report with the most usages by default')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        with transaction.atomic():
+            if options['seed_reports']:
+                self._seed(options)
+
+            for name, queryset in self._get_queries(options).items():
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(self._explain(queryset))
+                self.stdout.write('')
+
+            transaction.set_rollback(True)
+
+    def _get_queries(self, options: Dict[str, Any]) -> Dict[str, QuerySet]:
+        report_id = options['report_id']
+        if report_id is None:
+            report_id = RaidRun.objects.values('report_id').annotate(
+                usages=Count('consumableusage'),
+            ).order_by('-usages').values_list('report_id', flat=True).first()
+
+        usage = ConsumableUsage.objects.filter(raid_run__report_id=report_id).first()
+
+        return {
+            'Usages of a report (ExportReport)': ExportReport(report_id=report_id).get_usages_queryset(),
+            'Usages of a player and a consumable (admin)': ConsumableUsage.objects.filter(
+                player_id=usage.player_id if usage else None,
+                consumable_id=usage.consumable_id if usage else None,
+            ).order_by('-pk')[:100],
+            'Rows of the report page': ReportRow.objects.filter(
+                report_id=report_id,
+            ).order_by('player_name', 'id')[:200],
+            'Leaderboard': get_standings(),
+        }
+
+    @staticmethod
+    def _explain(queryset: QuerySet) -> str:
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True, buffers=True)
+
+        return queryset.explain()
+
+    def _seed(self, options: Dict[str, Any]) -> None:
+        user = User.objects.create(username='explain_queries')
+        raid = Raid.objects.create(name='Explain queries')
+        consumables = Consumable.objects.bulk_create([
+            Consumable(name=f'Explain queries {i}', spell_id=10 ** 9 + i, points_for_usage=1)
+            for i in range(options['consumables'])
+        ])
+        players = Player.objects.bulk_create([
+            Player(name=f'ExplainQueries{i}') for i in range(options['players'])
+        ])
+        # bulk_create returns ids only on PostgreSQL
+        if consumables[0].pk is None:
+            consumables = list(Consumable.objects.filter(spell_id__gte=10 ** 9))
+            players = list(Player.objects.filter(name__in=[player.name for player in players]))
+
+        raid_day = date.today()
+        for report_number in range(options['seed_reports']):
+            report = Report.objects.create(
+                uploaded_by=user,
+                raid_day=raid_day - timedelta(days=report_number),
+                raid_name=raid.name,
+            )
+            begin = timezone.make_aware(datetime.combine(report.raid_day, datetime.min.time())) + timedelta(hours=19)
+            raid_run = RaidRun.objects.create(report=report, raid=raid, begin=begin, end=begin + timedelta(hours=3))
+            raid_run.players.set(players)
+
+            ConsumableUsage.objects.bulk_create(
+                [
+                    ConsumableUsage(
+                        raid_run=raid_run,
+                        player=player,
+                        consumable=consumable,
+                        begin=begin + timedelta(minutes=usage * 9),
+                        end=begin + timedelta(minutes=usage * 9 + 10),
+                    )
+                    for player in players
+                    for consumable in consumables
+                    for usage in range(options['usages'])
+                ],
+                batch_size=1000,
+            )
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in SEEDED_TABLES:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        self.stdout.write(f'Seeded {options["seed_reports"]} reports')
@@ -5,7 +5,7 @@ from typing import Any
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand, CommandError
 
-from core.export_report import ExportReport
+from core.export_report import get_export_report
 from core.import_report import ReportImporter
 from extra_ep.models import Report
 
@@ -14,5 +14,5 @@ class Command(BaseCommand):
 
     def handle(self, *args: Any, **options: Any) -> None:
         report = Report.objects.order_by('-id').first()
-        result = ExportReport(report.id).process()
+        result = get_export_report(report.id).process()
         print(result)
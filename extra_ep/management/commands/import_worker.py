@@ -0,0 +1,50 @@
+import time
+from argparse import ArgumentParser
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from core.batch_scoring import BatchScorer, claim_reports_for_scoring
+from core.import_jobs import claim_job, run_job
+from extra_ep.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Process uploaded combat logs and score reports with outdated points when there is nothing to import. '
+        'Start the command several times to run workers in parallel'
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--sleep', type=float, default=2, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        while True:
+            job = claim_job()
+            if job is None:
+                if self._score_reports():
+                    continue
+
+                if options['once'] and not ImportJob.objects.filter(status=ImportJob.QUEUED).exists():
+                    return
+
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'Processing report {job.report_id}')
+            run_job(job)
+            self.stdout.write(f'Report {job.report_id}: {job.get_status_display()} in {job.duration}')
+
+    def _score_reports(self) -> bool:
+        """
+        Score one batch of marked reports, imports wait for one batch at most
+        """
+        report_ids = claim_reports_for_scoring(BatchScorer.BATCH_SIZE)
+        for scored_report in BatchScorer().process(report_ids):
+            if scored_report.error:
+                self.stderr.write(f'Report {scored_report.report_id} is not scored:\n{scored_report.error}')
+            else:
+                self.stdout.write(f'Report {scored_report.report_id} scored in {scored_report.seconds:.2f}s')
+
+        return bool(report_ids)
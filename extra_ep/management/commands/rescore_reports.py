@@ -0,0 +1,54 @@
+import os
+from argparse import ArgumentParser
+from datetime import date
+from time import perf_counter
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from core.batch_scoring import BatchScorer
+from extra_ep.models import Report
+
+
+class Command(BaseCommand):
+    help = 'Score reports again and update the leaderboard and the report cache, e.g. after a change of the rules'
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument('report_ids', nargs='*', type=int, help='All reports matching the filters by default')
+        parser.add_argument('--static', type=int)
+        parser.add_argument('--date-from', type=date.fromisoformat, help='Raid day, YYYY-MM-DD')
+        parser.add_argument('--date-to', type=date.fromisoformat, help='Raid day, YYYY-MM-DD')
+        parser.add_argument('--flushed', choices=('yes', 'no'))
+        parser.add_argument('--outdated', action='store_true', help='Only reports with outdated points')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=BatchScorer.BATCH_SIZE)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        reports = Report.objects.order_by('raid_day', 'id')
+        if options['report_ids']:
+            reports = reports.filter(id__in=options['report_ids'])
+        if options['static'] is not None:
+            reports = reports.filter(static=options['static'])
+        if options['date_from'] is not None:
+            reports = reports.filter(raid_day__gte=options['date_from'])
+        if options['date_to'] is not None:
+            reports = reports.filter(raid_day__lte=options['date_to'])
+        if options['flushed'] is not None:
+            reports = reports.filter(flushed=options['flushed'] == 'yes')
+        if options['outdated']:
+            reports = reports.filter(needs_scoring=True)
+
+        report_ids = list(reports.values_list('id', flat=True))
+        processes = max(min(options['processes'], len(report_ids)), 1)
+        scorer = BatchScorer(processes=processes, batch_size=options['batch_size'])
+
+        started_at = perf_counter()
+        for scored_report in scorer.process(report_ids):
+            if scored_report.error:
+                self.stderr.write(f'Report {scored_report.report_id} is not scored:\n{scored_report.error}')
+            else:
+                self.stdout.write(f'Report {scored_report.report_id}: {scored_report.seconds:.2f}s')
+
+        elapsed = perf_counter() - started_at
+        throughput = len(report_ids) / elapsed if elapsed else 0
+        self.stdout.write(f'{len(report_ids)} reports in {elapsed:.2f}s, {throughput:.2f} reports/s')
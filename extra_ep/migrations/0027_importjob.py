@@ -0,0 +1,48 @@
+# Generated by Django 3.2.9 on 2026-10-18 10:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0026_auto_20211120_1103'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('log_file', models.FileField(upload_to='logs/%Y/%m/%d/', verbose_name='Лог')),
+                ('status', models.CharField(
+                    choices=[
+                        ('queued', 'В очереди'),
+                        ('running', 'Обрабатывается'),
+                        ('done', 'Готово'),
+                        ('failed', 'Ошибка'),
+                    ],
+                    db_index=True,
+                    default='queued',
+                    max_length=10,
+                    verbose_name='Статус',
+                )),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало обработки')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание обработки')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('report', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='import_job',
+                    to='extra_ep.report',
+                    verbose_name='Отчет',
+                )),
+            ],
+            options={
+                'verbose_name': 'Загрузка лога',
+                'verbose_name_plural': 'Загрузки логов',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0027_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerReportPoints',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('points', models.IntegerField(verbose_name='Очки')),
+                ('player', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='extra_ep.player',
+                    verbose_name='Игрок',
+                )),
+                ('raid', models.ForeignKey(
+                    null=True,
+                    on_delete=django.db.models.deletion.SET_NULL,
+                    to='extra_ep.raid',
+                    verbose_name='Рейд',
+                )),
+                ('report', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='extra_ep.report',
+                    verbose_name='Отчет',
+                )),
+            ],
+            options={
+                'verbose_name': 'Очки игрока за отчет',
+                'verbose_name_plural': 'Очки игроков за отчеты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='playerreportpoints',
+            index=models.Index(fields=['report', 'player', 'points'], name='extra_ep_pl_report__73d260_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0028_playerreportpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscordMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('status', models.CharField(
+                    choices=[
+                        ('queued', 'В очереди'),
+                        ('sending', 'Отправляется'),
+                        ('sent', 'Отправлено'),
+                        ('failed', 'Ошибка'),
+                    ],
+                    default='queued',
+                    max_length=10,
+                    verbose_name='Статус',
+                )),
+                ('attempts', models.IntegerField(default=0, verbose_name='Попытки')),
+                ('next_attempt_at', models.DateTimeField(
+                    default=django.utils.timezone.now,
+                    verbose_name='Следующая попытка',
+                )),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Отправлено')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('report', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='extra_ep.report',
+                    verbose_name='Отчет',
+                )),
+            ],
+            options={
+                'verbose_name': 'Сообщение в дискорд',
+                'verbose_name_plural': 'Сообщения в дискорд',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='discordmessage',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='extra_ep_di_status_601579_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0029_discordmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('raid_name', models.CharField(max_length=30, verbose_name='Название рейда')),
+                ('player_name', models.CharField(max_length=30, verbose_name='Имя игрока')),
+                ('color', models.CharField(max_length=6, null=True, verbose_name='Цвет класса')),
+                ('item_id', models.IntegerField(null=True, verbose_name='ID предмета')),
+                ('spell_id', models.IntegerField(null=True, verbose_name='ID заклинания')),
+                ('group_name', models.CharField(max_length=30, null=True, verbose_name='Название группы')),
+                ('amount', models.IntegerField(null=True, verbose_name='Использовано раз')),
+                ('uptime', models.FloatField(null=True, verbose_name='Время действия %')),
+                ('points', models.IntegerField(verbose_name='Очки')),
+                ('group', models.ForeignKey(
+                    null=True,
+                    on_delete=django.db.models.deletion.SET_NULL,
+                    to='extra_ep.consumablegroup',
+                    verbose_name='Группа расходников',
+                )),
+                ('player', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='extra_ep.player',
+                    verbose_name='Игрок',
+                )),
+                ('raid_run', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='extra_ep.raidrun',
+                    verbose_name='Рейд',
+                )),
+                ('report', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='extra_ep.report',
+                    verbose_name='Отчет',
+                )),
+            ],
+            options={
+                'verbose_name': 'Строка отчета',
+                'verbose_name_plural': 'Строки отчетов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reportrow',
+            index=models.Index(fields=['report', 'player_name', 'id'], name='extra_ep_re_report__5cbaad_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0030_reportrow'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['raid_day', 'id'], name='extra_ep_re_raid_da_c754f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['static', 'raid_day', 'id'], name='extra_ep_re_static_084a4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['flushed', 'raid_day', 'id'], name='extra_ep_re_flushed_6b1911_idx'),
+        ),
+    ]
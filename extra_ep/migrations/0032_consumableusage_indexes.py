@@ -0,0 +1,45 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0031_report_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consumableusage',
+            index=models.Index(
+                fields=['raid_run', 'player', 'consumable', 'begin', 'end'],
+                name='extra_ep_co_raid_ru_04d7bc_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='consumableusage',
+            index=models.Index(fields=['player', 'consumable'], name='extra_ep_co_player__9a12fb_idx'),
+        ),
+        migrations.AlterField(
+            model_name='consumableusage',
+            name='player',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to='extra_ep.player',
+                verbose_name='Игрок',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='consumableusage',
+            name='raid_run',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to='extra_ep.raidrun',
+                verbose_name='Поход в рейд',
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0032_consumableusage_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='needs_scoring',
+            field=models.BooleanField(db_index=True, default=True, verbose_name='Очки устарели'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='scored_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Очки посчитаны'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:50
+
+from typing import Any
+
+from django.db import migrations, models
+
+
+def mark_reports_for_scoring(apps: Any, schema_editor: Any) -> None:
+    # rows and warnings of the report pages are filled by the import worker or `rescore_reports --outdated`
+    Report = apps.get_model('extra_ep', 'Report')
+    Report.objects.update(needs_scoring=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extra_ep', '0033_report_needs_scoring'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='warnings',
+            field=models.JSONField(blank=True, default=list, verbose_name='Ошибки при построении отчета'),
+        ),
+        migrations.RunPython(mark_reports_for_scoring, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,10 @@
 from datetime import timedelta
 from functools import cached_property
-from typing import Set
+from typing import Optional, Set
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 
 class BaseModel(models.Model):
@@ -209,8 +210,14 @@ class RaidRun(BaseModel):
 
 
 class ConsumableUsage(BaseModel):
-    raid_run = models.ForeignKey('extra_ep.RaidRun', verbose_name='Поход в рейд', on_delete=models.CASCADE)
-    player = models.ForeignKey('extra_ep.Player', verbose_name='Игрок', on_delete=models.CASCADE)
+    # both are the first columns of the indexes below, separate indexes only slow down the import
+    raid_run = models.ForeignKey(
+        'extra_ep.RaidRun',
+        verbose_name='Поход в рейд',
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    player = models.ForeignKey('extra_ep.Player', verbose_name='Игрок', on_delete=models.CASCADE, db_index=False)
 
     consumable = models.ForeignKey('extra_ep.Consumable', verbose_name='Расходник', on_delete=models.CASCADE)
 
@@ -223,6 +230,12 @@ class ConsumableUsage(BaseModel):
     class Meta:
         verbose_name = 'Использование расходника'
         verbose_name_plural = 'Использование расходников'
+        indexes = [
+            # ExportReport reads usages of raid runs from the index only, see `manage.py explain_queries`
+            models.Index(fields=['raid_run', 'player', 'consumable', 'begin', 'end']),
+            # filters of the admin
+            models.Index(fields=['player', 'consumable']),
+        ]
 
 
 class Report(BaseModel):
@@ -236,11 +249,148 @@ class Report(BaseModel):
     raid_day = models.DateField(verbose_name='День рейда', null=True)
     raid_name = models.CharField(verbose_name='Рейд', max_length=200, null=True)
     flushed = models.BooleanField(verbose_name='Очки начислены', default=False)
+    # set by the signals when the data of the report or the scoring config change, cleared by BatchScorer
+    needs_scoring = models.BooleanField(verbose_name='Очки устарели', default=True, db_index=True)
+    scored_at = models.DateTimeField(verbose_name='Очки посчитаны', null=True, blank=True)
+    # [{'text': ..., 'player_id': ...}] of the last scoring, shown on the report page
+    warnings = models.JSONField(verbose_name='Ошибки при построении отчета', default=list, blank=True)
 
     class Meta:
         verbose_name = 'Отчет'
         verbose_name_plural = 'Отчеты'
         ordering = ['-id']
+        indexes = [
+            # keyset pagination of the report list, with and without its filters
+            models.Index(fields=['raid_day', 'id']),
+            models.Index(fields=['static', 'raid_day', 'id']),
+            models.Index(fields=['flushed', 'raid_day', 'id']),
+        ]
 
     def __str__(self) -> str:
         return f'{self.raid_name} ({self.raid_day})'
+
+
+class PlayerReportPoints(BaseModel):
+    """
+    Points of a player for a raid in a report, sum of ExportReport result. Filled when the report is scored.
+    """
+    report = models.ForeignKey('extra_ep.Report', verbose_name='Отчет', on_delete=models.CASCADE)
+    player = models.ForeignKey('extra_ep.Player', verbose_name='Игрок', on_delete=models.CASCADE)
+    raid = models.ForeignKey('extra_ep.Raid', verbose_name='Рейд', on_delete=models.SET_NULL, null=True)
+    points = models.IntegerField(verbose_name='Очки')
+
+    class Meta:
+        verbose_name = 'Очки игрока за отчет'
+        verbose_name_plural = 'Очки игроков за отчеты'
+        indexes = [
+            # the leaderboard joins reports and sums points by player without reading the table
+            models.Index(fields=['report', 'player', 'points']),
+        ]
+
+
+class ReportRow(BaseModel):
+    """
+    Row of the report page, ExportReport result without zero points. Filled when the report is scored.
+    """
+    report = models.ForeignKey('extra_ep.Report', verbose_name='Отчет', on_delete=models.CASCADE)
+    raid_run = models.ForeignKey('extra_ep.RaidRun', verbose_name='Рейд', on_delete=models.CASCADE)
+    player = models.ForeignKey('extra_ep.Player', verbose_name='Игрок', on_delete=models.CASCADE)
+    group = models.ForeignKey(
+        'extra_ep.ConsumableGroup',
+        verbose_name='Группа расходников',
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+
+    raid_name = models.CharField(verbose_name='Название рейда', max_length=30)
+    player_name = models.CharField(verbose_name='Имя игрока', max_length=30)
+    color = models.CharField(verbose_name='Цвет класса', max_length=6, null=True)
+    item_id = models.IntegerField(verbose_name='ID предмета', null=True)
+    spell_id = models.IntegerField(verbose_name='ID заклинания', null=True)
+    group_name = models.CharField(verbose_name='Название группы', max_length=30, null=True)
+    amount = models.IntegerField(verbose_name='Использовано раз', null=True)
+    uptime = models.FloatField(verbose_name='Время действия %', null=True)
+    points = models.IntegerField(verbose_name='Очки')
+
+    class Meta:
+        verbose_name = 'Строка отчета'
+        verbose_name_plural = 'Строки отчетов'
+        indexes = [
+            # the report page is sorted by player, rows of a player keep the order of ExportReport
+            models.Index(fields=['report', 'player_name', 'id']),
+        ]
+
+
+class ImportJob(BaseModel):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Обрабатывается'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    report = models.OneToOneField(
+        'extra_ep.Report',
+        verbose_name='Отчет',
+        on_delete=models.CASCADE,
+        related_name='import_job',
+    )
+    log_file = models.FileField(verbose_name='Лог', upload_to='logs/%Y/%m/%d/')
+    status = models.CharField(verbose_name='Статус', max_length=10, choices=STATUSES, default=QUEUED, db_index=True)
+    started_at = models.DateTimeField(verbose_name='Начало обработки', null=True, blank=True)
+    finished_at = models.DateTimeField(verbose_name='Окончание обработки', null=True, blank=True)
+    error = models.TextField(verbose_name='Ошибка', blank=True, default='')
+
+    class Meta:
+        verbose_name = 'Загрузка лога'
+        verbose_name_plural = 'Загрузки логов'
+
+    def __str__(self) -> str:
+        return f'{self.report} - {self.get_status_display()}'
+
+    @property
+    def duration(self) -> Optional[timedelta]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+
+        return self.finished_at - self.started_at
+
+
+class DiscordMessage(BaseModel):
+    """
+    Outbox of reports to post to the Discord webhook, sent by the discord_sender command
+    """
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    report = models.ForeignKey('extra_ep.Report', verbose_name='Отчет', on_delete=models.CASCADE)
+    status = models.CharField(verbose_name='Статус', max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.IntegerField(verbose_name='Попытки', default=0)
+    next_attempt_at = models.DateTimeField(verbose_name='Следующая попытка', default=timezone.now)
+    sent_at = models.DateTimeField(verbose_name='Отправлено', null=True, blank=True)
+    error = models.TextField(verbose_name='Ошибка', blank=True, default='')
+
+    class Meta:
+        verbose_name = 'Сообщение в дискорд'
+        verbose_name_plural = 'Сообщения в дискорд'
+        indexes = [
+            # the sender looks for due messages only
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.report} - {self.get_status_display()}'
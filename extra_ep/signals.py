@@ -0,0 +1,123 @@
+from typing import Any, Iterable
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.batch_scoring import mark_reports_for_scoring
+from core.report_cache import invalidate_reports
+from core.scoring_config import invalidate_scoring_config
+from extra_ep.models import (
+    Boss, Class, Consumable, ConsumableGroup, ConsumableUsage, ConsumableUsageLimit, ConsumablesSet, Player, Raid,
+    RaidRun, Report,
+)
+
+# models of core.scoring_config.ScoringConfig
+SCORING_CONFIG_MODELS = (Boss, Consumable, ConsumableGroup, ConsumableUsageLimit, ConsumablesSet, Raid)
+
+
+# invalidation is postponed until commit, otherwise a view could cache the data of the running transaction.
+# Reports are marked for the import worker in the same transaction as the change.
+def _on_scoring_config_changed() -> None:
+    mark_reports_for_scoring(Report.objects.all())
+    transaction.on_commit(invalidate_scoring_config)
+
+
+def _on_reports_changed(report_ids: Iterable[int]) -> None:
+    report_ids = set(report_ids)
+    if not report_ids:
+        return
+
+    mark_reports_for_scoring(Report.objects.filter(id__in=report_ids))
+    transaction.on_commit(lambda: invalidate_reports(report_ids))
+
+
+def _on_report_changed(report_id: int) -> None:
+    _on_reports_changed([report_id])
+
+
+def _on_players_changed(players: 'QuerySet[Player]') -> None:
+    # only reports the players are in, the scoring config itself is the same
+    _on_reports_changed(RaidRun.objects.filter(players__in=players).values_list('report_id', flat=True))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def scoring_config_changed(sender: Any, **kwargs: Any) -> None:
+    if sender in SCORING_CONFIG_MODELS:
+        _on_scoring_config_changed()
+
+
+@receiver(m2m_changed, sender=ConsumablesSet.consumables.through)
+@receiver(m2m_changed, sender=ConsumablesSet.groups.through)
+@receiver(m2m_changed, sender=ConsumableGroup.consumables.through)
+def scoring_config_relation_changed(action: str, **kwargs: Any) -> None:
+    if action.startswith('post_'):
+        _on_scoring_config_changed()
+
+
+@receiver(pre_save, sender=Player)
+def player_changed(instance: Player, **kwargs: Any) -> None:
+    if instance.pk is None:
+        return
+
+    # names are shown in report pages and the API
+    old = Player.objects.filter(pk=instance.pk).values_list('name', 'role_id', 'klass_id').first()
+    if old != (instance.name, instance.role_id, instance.klass_id):
+        _on_players_changed(Player.objects.filter(pk=instance.pk))
+
+
+# before the deletion, raid runs of the player are not known after it
+@receiver(pre_delete, sender=Player)
+def player_deleted(instance: Player, **kwargs: Any) -> None:
+    _on_players_changed(Player.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=Class)
+def class_changed(instance: Class, **kwargs: Any) -> None:
+    if instance.pk is None:
+        return
+
+    # colors are stored in rows of report pages
+    old_color = Class.objects.filter(pk=instance.pk).values_list('color', flat=True).first()
+    if old_color != instance.color:
+        _on_players_changed(Player.objects.filter(klass=instance))
+
+
+# players lose the class after the deletion
+@receiver(pre_delete, sender=Class)
+def class_deleted(instance: Class, **kwargs: Any) -> None:
+    _on_players_changed(Player.objects.filter(klass=instance))
+
+
+@receiver(post_save, sender=RaidRun)
+@receiver(post_delete, sender=RaidRun)
+def raid_run_changed(instance: RaidRun, **kwargs: Any) -> None:
+    _on_report_changed(instance.report_id)
+
+
+@receiver(m2m_changed, sender=RaidRun.players.through)
+def raid_run_players_changed(instance: Any, action: str, reverse: bool, pk_set: Any, **kwargs: Any) -> None:
+    if not reverse:
+        if action.startswith('post_'):
+            _on_report_changed(instance.report_id)
+        return
+
+    # raid runs of the player were changed
+    if action == 'pre_clear':
+        raid_runs = RaidRun.objects.filter(players=instance)
+    elif action in ('post_add', 'post_remove'):
+        raid_runs = RaidRun.objects.filter(pk__in=pk_set)
+    else:
+        return
+
+    _on_reports_changed(raid_runs.values_list('report_id', flat=True))
+
+
+# no post_delete, it would disable fast deletion of usages together with raid runs and reports
+@receiver(post_save, sender=ConsumableUsage)
+def consumable_usage_changed(instance: ConsumableUsage, **kwargs: Any) -> None:
+    report_id = RaidRun.objects.filter(pk=instance.raid_run_id).values_list('report_id', flat=True).first()
+    if report_id is not None:
+        _on_report_changed(report_id)
@@ -8,11 +8,23 @@ urlpatterns = [
 
     path(r'report/<int:report_id>/', views.ReportDetailView.as_view(), name='report'),
     path(r'report/<int:report_id>/export', views.ExportReportView.as_view(), name='report_export'),
+    path(
+        r'report/<int:report_id>/export.<str:export_format>',
+        views.ExportReportCsvView.as_view(),
+        name='report_export_file',
+    ),
     path(r'report/<int:report_id>/send_to_discord', views.DiscordHookView.as_view(), name='send_to_discord'),
     path(r'report/<int:report_id>/change_exported', views.ChangeExportedView.as_view(), name='change_exported'),
 
     path(r'report/create/', views.CreateReportView.as_view(), name='report_create'),
     path(r'reports/', views.ReportListView.as_view(), name='report_list'),
+    path(r'reports/export.<str:export_format>', views.ExportReportsCsvView.as_view(), name='reports_export_file'),
+    path(r'leaderboard/', views.LeaderboardView.as_view(), name='leaderboard'),
+    path(r'leaderboard.json', views.LeaderboardJsonView.as_view(), name='leaderboard_json'),
+    path(r'tracked_spells.json', views.TrackedSpellsManifestView.as_view(), name='tracked_spells'),
+
+    path(r'api/v1/reports/', views.ReportsApiView.as_view(), name='api_reports'),
+    path(r'api/v1/reports/<int:report_id>/', views.ReportApiView.as_view(), name='api_report'),
 
     path(
         'consumable_info/<int:class_id>/<int:role_id>/',
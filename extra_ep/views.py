@@ -1,19 +1,33 @@
-import codecs
-from typing import Any, Dict
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Tuple
 
-import chardet
 import django_tables2 as tables
+from django.conf import settings
 from django.contrib import messages
+from django.db.models import QuerySet
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
-from django.views.generic import CreateView, DetailView, ListView, RedirectView, UpdateView
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.generic import CreateView, DetailView, ListView, RedirectView, UpdateView, View
 from django_tables2 import A
 
-from core.discord import DiscordNotification
-from core.export_report import ConsumableUsageModel, ExportReport, UptimeConsumableUsageModel
-from extra_ep.forms import ChangeExportedForm, UploadFile
-from extra_ep.models import Class, Consumable, ConsumableGroup, ConsumablesSet, Player, RaidRun, Report, Role
-from core.import_report import ReportImporter
+from core.discord_sender import enqueue_report
+from core.export_csv import iter_csv_rows, iter_report_points
+from core.leaderboard import get_standings
+from core.report_api import get_report_etag, get_reports_etag, serialize_report, serialize_report_fields
+from core.report_cache import get_report_result
+from core.report_pagination import estimate_count, paginate_reports
+from core.scoring_config import get_scoring_config
+from extra_ep.forms import (
+    ChangeExportedForm, ExportReportsForm, LeaderboardForm, ReportListForm, ReportsApiForm, UploadFile,
+)
+from extra_ep.models import (
+    Class, ConsumablesSet, ImportJob, PlayerReportPoints, Report, ReportRow, Role,
+)
 
 
 class MainRedirectView(RedirectView):
@@ -23,19 +37,60 @@ class MainRedirectView(RedirectView):
 class ReportTable(tables.Table):
     raid_name = tables.LinkColumn(
         viewname='extra_ep:report',
-        text=lambda report: report.raid_name,
+        text=lambda report: report.raid_name or f'Отчет {report.id}',
         kwargs={'report_id': A('pk')},
     )
 
     class Meta:
         model = Report
         fields = ('raid_name', 'static', 'raid_day', 'flushed', 'uploaded_by', 'created_at')
+        # rows are in the order of the keyset pagination
+        orderable = False
 
 
 class ReportListView(tables.SingleTableView):
     model = Report
     table_class = ReportTable
     template_name = 'extra_ep/report/report_list_template.html'
+    table_pagination = False
+    per_page = 25
+
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> HttpResponse:
+        self.filter_form = ReportListForm(request.GET)
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self) -> 'QuerySet[Report]':
+        reports = Report.objects.select_related('uploaded_by')
+        if not self.filter_form.is_valid():
+            return reports
+
+        if self.filter_form.cleaned_data['static'] is not None:
+            reports = reports.filter(static=self.filter_form.cleaned_data['static'])
+        if self.filter_form.cleaned_data['flushed'] is not None:
+            reports = reports.filter(flushed=self.filter_form.cleaned_data['flushed'])
+
+        return reports
+
+    def get_table_data(self) -> List[Report]:
+        self.page = paginate_reports(
+            self.object_list,
+            self.per_page,
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return self.page.reports
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['export_form'] = ExportReportsForm()
+        context['filter_form'] = self.filter_form
+        context['page'] = self.page
+        if settings.REPORT_LIST_ESTIMATED_COUNT:
+            context['reports_count'] = estimate_count(self.object_list)
+        else:
+            context['reports_count'] = self.object_list.count()
+
+        return context
 
 
 class CreateReportView(CreateView):
@@ -53,15 +108,8 @@ class CreateReportView(CreateView):
     def form_valid(self, form):
         result = super().form_valid(form)
 
-        chardet_result = chardet.detect(form.files['log_file'].file.read(1000))
-        encoding = chardet_result['encoding']
-        form.files['log_file'].file.seek(0)
-
-        importer = ReportImporter(
-            report_id=self.object.id,
-            log_file=codecs.iterdecode(form.files['log_file'].file, encoding),
-        )
-        importer.process()
+        # the log is processed by `manage.py import_worker`
+        ImportJob.objects.create(report=self.object, log_file=form.cleaned_data['log_file'])
 
         return result
 
@@ -76,12 +124,14 @@ class ChangeExportedView(UpdateView):
 
 
 class ReportDetailTable(tables.Table):
-    raid = tables.Column(verbose_name='Рейд')
+    raid = tables.Column(verbose_name='Рейд', accessor='raid_name')
     player = tables.TemplateColumn(
         verbose_name='Игрок',
+        accessor='player_name',
+        order_by=('player_name', 'id'),
         template_code='''
 <font {% if record.color %}color="{{ record.color }}"{% endif %}>
-    {{ record.player }}
+    {{ record.player_name }}
 </font>
 '''
     )
@@ -93,11 +143,11 @@ class ReportDetailTable(tables.Table):
 {% elif record.spell_id %}
     <a href="#" data-wowhead="spell={{ record.spell_id }}&domain=ru.tbc" >Spell</a>
 {% elif record.group_name %}
-    {% if not record.group_consumables %}
+    {% if not record.group.consumables.all %}
         {{ record.group_name }}
     {% else %}
         <span class="tooltiptext">
-            {% for consumable in record.group_consumables %}
+            {% for consumable in record.group.consumables.all %}
                 <div>
                     {% if consumable.item_id %}
                         <a href="#" data-wowhead="item={{ consumable.item_id }}&domain=ru.tbc" >Item</a>
@@ -126,99 +176,143 @@ class ReportDetailView(tables.SingleTableView):
     pk_url_kwarg = 'report_id'
     template_name = 'extra_ep/report/report_detail.html'
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.warnings = []
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         report = get_object_or_404(Report, id=self.kwargs['report_id'])
         context['report'] = report
-        context['warnings'] = self.warnings
+        context['import_job'] = ImportJob.objects.filter(report_id=report.id).first()
+        context['warnings'] = report.warnings
         context['change_exported_from'] = ChangeExportedForm(instance=report)
 
         return context
 
-    def get_table_data(self):
+    def get_queryset(self):
         report_id = self.kwargs['report_id']
-        exporter = ExportReport(report_id)
-        data = exporter.process()
-        self.warnings = exporter.warnings
+        # rows and warnings are written by the import worker, outdated reports are shown until it scores them
+        return ReportRow.objects.filter(
+            report_id=report_id,
+        ).prefetch_related(
+            'group__consumables',
+        ).order_by('player_name', 'id')
+
+
+class ExportReportView(DetailView):
+    model = Report
+    template_name = 'extra_ep/report/report_export_template.html'
+    pk_url_kwarg = 'report_id'
 
-        result = []
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        context = super().get_context_data()
+        context['data'] = self._get_aggregated_data()
 
-        consumables = {consumable.id: consumable for consumable in Consumable.objects.all()}
-        group_qs = ConsumableGroup.objects.prefetch_related('consumables').all()
-        consumable_groups = {group.id: group for group in group_qs}
+        return context
 
-        raid_runs_qs = RaidRun.objects.select_related('raid').filter(report_id=report_id)
-        raid_runs = {raid_run.id: raid_run for raid_run in raid_runs_qs}
-        players_qs = Player.objects.select_related('klass').filter(id__in=data.keys())
-        players = {player.id: player for player in players_qs}
+    def _get_aggregated_data(self) -> str:
+        return '\n'.join(f'{player_name},{points}' for _, player_name, points in iter_report_points([self.object]))
 
-        for player_id, raid_run_data in data.items():
-            player = players[player_id]
 
-            for raid_run_id, usage_models in raid_run_data.items():
-                raid_run = raid_runs[raid_run_id]
+# format -> (delimiter, content type)
+EXPORT_FORMATS = {
+    'csv': (',', 'text/csv'),
+    'tsv': ('\t', 'text/tab-separated-values'),
+}
 
-                for usage_model in usage_models:
-                    if usage_model.points == 0:
-                        continue
 
-                    data = {}
-                    if isinstance(usage_model, ConsumableUsageModel):
-                        if not usage_model.times_used:
-                            continue
-                        data['amount'] = usage_model.times_used
+class BaseCsvExportView(View, ABC):
+    """
+    Streams points of players in the reports from the leaderboard as CSV or TSV
+    """
+    header: Tuple[str, ...] = ()
 
-                    if isinstance(usage_model, UptimeConsumableUsageModel):
-                        data['uptime'] = round(usage_model.coefficient * 100, 2)
+    def get(self, request: Any, export_format: str, *args: Any, **kwargs: Any) -> HttpResponse:
+        if export_format not in EXPORT_FORMATS:
+            raise Http404('Unknown format')
 
-                    consumable_group = consumable_groups.get(usage_model.group_id)
-                    consumable = consumables.get(usage_model.consumable_id)
+        reports = self.get_reports()
+        etag = self._get_etag(export_format, reports)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
 
-                    result.append({
-                        'player': player.name,
-                        'color': player.klass.color if player.klass else None,
-                        'raid': raid_run.raid.name,
-                        'points': usage_model.points,
-                        'item_id': consumable.item_id if consumable else None,
-                        'spell_id': consumable.spell_id if consumable else None,
-                        'group_name': consumable_group.name if consumable_group else None,
-                        'group_consumables': consumable_group.consumables.all() if consumable_group else None,
-                        **data,
-                    })
+        delimiter, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            iter_csv_rows(self._iter_rows(reports), delimiter),
+            content_type=f'{content_type}; charset=utf-8',
+        )
+        response['ETag'] = etag
+        response['Content-Disposition'] = f'attachment; filename="{self.get_filename()}.{export_format}"'
+        return response
 
-        return sorted(result, key=lambda row: row['player'])
+    @abstractmethod
+    def get_reports(self) -> List[Report]:
+        ...
 
+    @abstractmethod
+    def get_filename(self) -> str:
+        ...
 
-class ExportReportView(DetailView):
-    model = Report
-    template_name = 'extra_ep/report/report_export_template.html'
-    pk_url_kwarg = 'report_id'
+    @abstractmethod
+    def get_row(self, report: Report, player_name: str, points: int) -> List[Any]:
+        ...
 
-    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
-        context = super().get_context_data()
-        context['data'] = self._get_aggregated_data()
+    def _get_etag(self, export_format: str, reports: List[Report]) -> str:
+        # points are written only when the reports are scored
+        reports_data = [
+            (report.id, report.raid_day, report.raid_name, report.static, report.scored_at) for report in reports
+        ]
+        etag_data = f'{export_format}:{reports_data}'
+        return quote_etag(hashlib.sha1(etag_data.encode()).hexdigest())
 
-        return context
+    def _iter_rows(self, reports: List[Report]) -> Iterator[List[Any]]:
+        yield list(self.header)
+        for report, player_name, points in iter_report_points(reports):
+            yield self.get_row(report, player_name, points)
 
-    def _get_aggregated_data(self) -> str:
-        data = ExportReport(report_id=self.object.id).process()
-        rows = []
 
-        for player_id, raid_run_data in data.items():
-            player: Player = Player.objects.get(id=player_id)
-            points = 0
+class ExportReportCsvView(BaseCsvExportView):
+    header = ('player', 'points')
+
+    def get_reports(self) -> List[Report]:
+        return [get_object_or_404(Report, id=self.kwargs['report_id'])]
 
-            for raid_run_id, usage_models in raid_run_data.items():
-                for usage_model in usage_models:
-                    points += usage_model.points
+    def get_filename(self) -> str:
+        return f'report_{self.kwargs["report_id"]}'
 
-            rows.append(f'{player.name},{points}')
+    def get_row(self, report: Report, player_name: str, points: int) -> List[Any]:
+        return [player_name, points]
 
-        return '\n'.join(sorted(rows))
+
+class ExportReportsCsvView(BaseCsvExportView):
+    header = ('report_id', 'raid_day', 'raid_name', 'static', 'player', 'points')
+
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> HttpResponse:
+        self.form = ExportReportsForm(request.GET)
+        if not self.form.is_valid():
+            return HttpResponseBadRequest(self.form.errors.as_text())
+
+        return super().get(request, *args, **kwargs)
+
+    def get_reports(self) -> List[Report]:
+        reports = Report.objects.filter(
+            raid_day__gte=self.form.cleaned_data['date_from'],
+            raid_day__lte=self.form.cleaned_data['date_to'],
+        ).order_by('raid_day', 'id')
+        if self.form.cleaned_data['static'] is not None:
+            reports = reports.filter(static=self.form.cleaned_data['static'])
+
+        return list(reports)
+
+    def get_filename(self) -> str:
+        static = self.form.cleaned_data['static']
+        return '_'.join(filter(None, [
+            'reports',
+            f'static{static}' if static is not None else None,
+            self.form.cleaned_data['date_from'].isoformat(),
+            self.form.cleaned_data['date_to'].isoformat(),
+        ]))
+
+    def get_row(self, report: Report, player_name: str, points: int) -> List[Any]:
+        return [report.id, report.raid_day, report.raid_name, report.static, player_name, points]
 
 
 class DiscordHookView(DetailView):
@@ -227,11 +321,133 @@ class DiscordHookView(DetailView):
 
     def post(self, request: Any, *args: Any, **kwargs: Any) -> Any:
         report = self.get_object()
-        DiscordNotification(report=report).notify()
-        messages.success(request, 'Данные успешно отправлены в дискорд')
+        enqueue_report(report)
+        messages.success(request, 'Отчет поставлен в очередь на отправку в дискорд')
         return redirect('extra_ep:report', report_id=report.id)
 
 
+class LeaderboardTable(tables.Table):
+    player = tables.TemplateColumn(
+        verbose_name='Игрок',
+        accessor='player__name',
+        template_code='''
+<font {% if record.player__klass__color %}color="{{ record.player__klass__color }}"{% endif %}>
+    {{ record.player__name }}
+</font>
+''',
+    )
+    total_points = tables.Column(verbose_name='Очки')
+    reports = tables.Column(verbose_name='Отчетов')
+
+
+class LeaderboardView(tables.SingleTableView):
+    table_class = LeaderboardTable
+    template_name = 'extra_ep/leaderboard.html'
+
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> Any:
+        self.form = LeaderboardForm(request.GET)
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self) -> Any:
+        if not self.form.is_valid():
+            return PlayerReportPoints.objects.none()
+
+        return get_standings(**self.form.cleaned_data)
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['form'] = self.form
+        return context
+
+
+class LeaderboardJsonView(View):
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> JsonResponse:
+        form = LeaderboardForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        standings = [
+            {
+                'player_id': row['player_id'],
+                'player': row['player__name'],
+                'points': row['total_points'],
+                'reports': row['reports'],
+            }
+            for row in get_standings(**form.cleaned_data)
+        ]
+        return JsonResponse({'standings': standings})
+
+
+class ReportApiView(View):
+    """
+    ExportReport result as JSON. Unchanged reports are answered with 304 without scoring
+    """
+
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> HttpResponse:
+        report = get_object_or_404(Report, id=self.kwargs['report_id'])
+
+        # taken before the result, so a result changed meanwhile is never sent with the old ETag
+        etag = get_report_etag(report)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+        response = JsonResponse(serialize_report(report, get_report_result(report.id)))
+        response['ETag'] = etag
+        return response
+
+
+class ReportsApiView(View):
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> HttpResponse:
+        form = ReportsApiForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        reports = Report.objects.order_by('-raid_day', '-id')
+        if form.cleaned_data['static'] is not None:
+            reports = reports.filter(static=form.cleaned_data['static'])
+        if form.cleaned_data['date_from'] is not None:
+            reports = reports.filter(raid_day__gte=form.cleaned_data['date_from'])
+        if form.cleaned_data['date_to'] is not None:
+            reports = reports.filter(raid_day__lte=form.cleaned_data['date_to'])
+        if form.cleaned_data['flushed'] is not None:
+            reports = reports.filter(flushed=form.cleaned_data['flushed'])
+        reports = list(reports)
+
+        etag = get_reports_etag(reports)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+        response = JsonResponse({
+            'reports': [
+                {
+                    **serialize_report_fields(report),
+                    'url': reverse('extra_ep:api_report', kwargs={'report_id': report.id}),
+                }
+                for report in reports
+            ],
+        })
+        response['ETag'] = etag
+        return response
+
+
+class TrackedSpellsManifestView(View):
+    """
+    Spell and encounter ids the importer cares about, `cut_off.py --manifest` drops all other spells
+    """
+
+    def get(self, request: Any, *args: Any, **kwargs: Any) -> JsonResponse:
+        scoring_config = get_scoring_config()
+        data = {
+            'spell_ids': sorted(scoring_config.consumables_by_spell_id),
+            'encounter_ids': sorted(scoring_config.bosses),
+        }
+        version = hashlib.sha1(json.dumps(data).encode()).hexdigest()[:12]
+
+        return JsonResponse({'version': version, **data})
+
+
 class ClassListView(ListView):
     model = Class
     template_name = 'extra_ep/consumable_info/class_list_template.html'
@@ -136,6 +136,27 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     'static',
 ]
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# processes used by import_worker to read one log, 1 means sequential import
+IMPORT_PROCESSES = 1
+
+# shared by the web and import_worker processes, signals of the worker invalidate reports
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+}
+# seconds, results are also invalidated on changes of reports and consumables
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# the report list shows the row estimate of PostgreSQL instead of COUNT
+REPORT_LIST_ESTIMATED_COUNT = True
+
+# score reports with numpy arrays, see core/export_report_numpy.py
+EXPORT_VECTORIZED = False
+
 BREADCRUMBS_TEMPLATE = 'django_bootstrap_breadcrumbs/bootstrap4.html'
 
 DJANGO_TABLES2_TEMPLATE = 'django_tables2/bootstrap4.html'
@@ -152,6 +173,8 @@ LOGOUT_REDIRECT_URL = '/'
 LOGIN_REDIRECT_URL = '/'
 
 DISCORD_WEBHOOK_URL = ''
+# seconds, requests of discord_sender to the webhook
+DISCORD_TIMEOUT = 10
 
 BASE_URL = 'http://127.0.0.1/'
 